@@ -1,15 +1,11 @@
 import os
-from openai import AzureOpenAI
 from dotenv import load_dotenv
+from pipelines.context_builder import build_context
+from monitoring.metrics import stage, record_usage
+from core.clients import get_openai_client
 
 load_dotenv('config/.env')
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
-
 def response_agent(state):
     """Agent 3 - Generates final response"""
     print("💬 Response Agent running...")
@@ -24,7 +20,8 @@ def response_agent(state):
         return state
     
     # Build context
-    context = "\n\n".join([c["content"] for c in chunks])
+    with stage("prompt_build"):
+        context, _, _ = build_context(chunks)
     sources = list(set([c["category"] for c in chunks]))
     
     system_prompt = """You are a helpful Medicare healthcare assistant.
@@ -39,15 +36,17 @@ Question: {query}
 
 Answer:"""
     
-    response = client.chat.completions.create(
-        model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0.1,
-        max_tokens=500
-    )
+    with stage("generate"):
+        response = get_openai_client().chat.completions.create(
+            model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.1,
+            max_tokens=500
+        )
+        record_usage(response.usage)
     
     state["final_answer"] = response.choices[0].message.content
     state["sources"] = sources
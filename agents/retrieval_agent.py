@@ -1,56 +1,34 @@
-import os
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizedQuery
-from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
 from dotenv import load_dotenv
+from embeddings.query_cache import embed_query
+from vectorstore.retriever import RETRIEVER, HYBRID_CANDIDATES, local_search
+from vectorstore.azure_search import keyword_search, vector_search
+from api.stages import merge_results
+from monitoring.metrics import stage
 
 load_dotenv('config/.env')
 
-openai_client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
-
-search_client = SearchClient(
-    endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
-    index_name=os.getenv("AZURE_SEARCH_INDEX"),
-    credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY"))
-)
-
 def retrieval_agent(state):
     """Agent 1 - Retrieves relevant documents"""
     print("🔍 Retrieval Agent running...")
     query = state["query"]
+    filters = state.get("filters")
 
-    # Generate embedding
-    response = openai_client.embeddings.create(
-        input=query,
-        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    )
-    embedding = response.data[0].embedding
+    if RETRIEVER != "azure":
+        with stage("search", retriever=RETRIEVER):
+            chunks = local_search(query, top_k=3, filters=filters)
+        state["retrieved_chunks"] = chunks
+        state["retrieval_done"] = True
+        print(f"✅ Retrieved {len(chunks)} chunks ({RETRIEVER})")
+        return state
 
-    # Vector search
-    vector_query = VectorizedQuery(
-        vector=embedding,
-        k_nearest_neighbors=3,
-        fields="embedding"
-    )
-
-    results = search_client.search(
-        search_text=query,
-        vector_queries=[vector_query],
-        top=3
-    )
+    # Generate embedding
+    with stage("embed"):
+        embedding = embed_query(query)
 
-    chunks = []
-    for r in results:
-        chunks.append({
-            "content": r["content"],
-            "category": r["category"],
-            "source": r["source"]
-        })
+    # Vector and keyword search, gated on relevance and fused as in the API
+    with stage("search", retriever="azure"):
+        chunks = merge_results(vector_search(embedding, HYBRID_CANDIDATES, filters),
+                               keyword_search(query, HYBRID_CANDIDATES, filters), hybrid=True)
 
     state["retrieved_chunks"] = chunks
     state["retrieval_done"] = True
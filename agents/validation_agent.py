@@ -1,3 +1,25 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv('config/.env')
+
+# Cosine similarity below which retrieved chunks are dropped; unset disables
+# the check. Similarities range from -1 to 1, and unrelated text scores ~0.7
+# with text-embedding-ada-002, so ~0.78 is a reasonable cutoff there;
+# text-embedding-3 models need a lower value.
+MIN_SIMILARITY_SCORE = (float(os.environ["MIN_SIMILARITY_SCORE"])
+                        if os.getenv("MIN_SIMILARITY_SCORE") else None)
+
+def is_relevant(similarity_score, min_score=MIN_SIMILARITY_SCORE):
+    """Whether a cosine similarity clears the threshold. Keyword hits carry
+    no similarity and pass, with either retriever; they are only answered
+    from alongside a vector hit that clears it."""
+    return min_score is None or similarity_score is None or similarity_score >= min_score
+
+def relevant_chunks(chunks, min_score=MIN_SIMILARITY_SCORE):
+    """Chunks whose similarity score clears min_score"""
+    return [c for c in chunks if is_relevant(c.get("similarity_score"), min_score)]
+
 def validation_agent(state):
     """Agent 2 - Validates retrieved content"""
     print("✔️ Validation Agent running...")
@@ -17,6 +39,15 @@ def validation_agent(state):
         state["validation_message"] = "Insufficient context"
         return state
     
+    # Check retrieval relevance, so unanswerable queries skip the LLM
+    chunks = relevant_chunks(chunks)
+    if not chunks:
+        state["validation_passed"] = False
+        state["validation_message"] = "Retrieved content below relevance threshold"
+        print(f"❌ Validation: {state['validation_message']}")
+        return state
+    state["retrieved_chunks"] = chunks
+    
     # Check if query is healthcare related
     healthcare_keywords = [
         "medicare", "medicaid", "health", "medical", "insurance",
@@ -0,0 +1,148 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+sys.path.append('.')
+from vectorstore.index_version import current_index_version, azure_index_version
+from vectorstore.retriever import RETRIEVER
+
+load_dotenv('config/.env')
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+# Seconds between checks of the index version, to drop answers after a rebuild.
+# The local store's version is a file next to it; Azure AI Search's comes from
+# the index statistics, one request per check
+ANSWER_CACHE_VERSION_CHECK_INTERVAL = float(os.getenv("ANSWER_CACHE_VERSION_CHECK_INTERVAL", "5"))
+
+# key -> (row, response, stored_at), oldest first. Each entry's unit query
+# embedding is a row of _vectors and its scope the same row of _scopes, so
+# a lookup scores every entry with one matrix product and a store writes
+# one row; rows of removed entries are reused.
+_entries = OrderedDict()
+_vectors = None
+_scopes = np.empty(ANSWER_CACHE_SIZE, dtype=object)
+_live = np.zeros(ANSWER_CACHE_SIZE, dtype=bool)
+_row_keys = [None] * ANSWER_CACHE_SIZE
+_free_rows = []
+_rows_used = 0
+_index_version = None
+_last_version_check = None
+_next_key = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _unit(embedding):
+    vector = np.asarray(embedding, dtype='float32')
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+def _read_index_version():
+    if RETRIEVER == "azure":
+        return azure_index_version()
+    return current_index_version()
+
+def _clear():
+    global _free_rows, _rows_used
+    _entries.clear()
+    _live[:] = False
+    _free_rows = []
+    _rows_used = 0
+
+def _remove(key):
+    row = _entries.pop(key)[0]
+    _live[row] = False
+    _free_rows.append(row)
+
+def _check_index_version(now):
+    """Drop everything if the index changed since the entries were stored.
+
+    The version is read at most once per check interval, outside the lock
+    as it may take a request to the search service.
+    """
+    global _index_version, _last_version_check
+    with _lock:
+        if (_last_version_check is not None
+                and now - _last_version_check < ANSWER_CACHE_VERSION_CHECK_INTERVAL):
+            return
+        _last_version_check = now
+    try:
+        version = _read_index_version()
+    except Exception as e:
+        print(f"⚠️ Could not read the index version, keeping cached answers: {e}")
+        return
+    with _lock:
+        if version != _index_version:
+            _clear()
+            _index_version = version
+
+def _expire(now):
+    while _entries:
+        key, (_, _, stored_at) = next(iter(_entries.items()))
+        if now - stored_at <= ANSWER_CACHE_TTL:
+            break
+        _remove(key)
+
+def lookup(embedding, scope=""):
+    """Return the cached response for the most similar recent question, if close enough.
+
+    Only answers stored under the same scope (e.g. the search filters) match.
+    """
+    if not ANSWER_CACHE_ENABLED:
+        return None
+
+    query = _unit(embedding)
+    now = time.time()
+    _check_index_version(now)
+    with _lock:
+        _expire(now)
+        if not _entries:
+            _stats["misses"] += 1
+            return None
+
+        rows = slice(0, _rows_used)
+        scores = np.where(_live[rows] & (_scopes[rows] == scope), _vectors[rows] @ query, -np.inf)
+        best = int(np.argmax(scores))
+        if scores[best] < ANSWER_CACHE_THRESHOLD:
+            _stats["misses"] += 1
+            return None
+
+        _stats["hits"] += 1
+        return _entries[_row_keys[best]][1]
+
+def store(embedding, response, scope=""):
+    """Remember the response for a question embedding"""
+    global _vectors, _rows_used, _next_key
+    if not ANSWER_CACHE_ENABLED:
+        return
+
+    vector = _unit(embedding)
+    now = time.time()
+    _check_index_version(now)
+    with _lock:
+        if _vectors is None or _vectors.shape[1] != len(vector):
+            _vectors = np.zeros((ANSWER_CACHE_SIZE, len(vector)), dtype='float32')
+            _clear()
+        if not _free_rows and _rows_used == ANSWER_CACHE_SIZE:
+            _remove(next(iter(_entries)))
+        if _free_rows:
+            row = _free_rows.pop()
+        else:
+            row = _rows_used
+            _rows_used += 1
+
+        _vectors[row] = vector
+        _scopes[row] = scope
+        _live[row] = True
+        _row_keys[row] = _next_key
+        _entries[_next_key] = (row, response, now)
+        _next_key += 1
+
+def cache_stats():
+    """Hit/miss counts and current number of cached answers"""
+    with _lock:
+        return {**_stats, "size": len(_entries), "max_size": ANSWER_CACHE_SIZE}
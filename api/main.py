@@ -1,24 +1,150 @@
 import sys
 sys.path.append('.')
 
+import asyncio
+import json
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
+import aiohttp
+import anyio
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from openai import AzureOpenAI
 from dotenv import load_dotenv
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizedQuery
-from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+from embeddings import query_cache
+from embeddings.query_cache import embed_query, aembed_query, embed_queries
+from api import answer_cache, warmup
+from pipelines.questions import read_questions
+from vectorstore.retriever import (RETRIEVER, HYBRID_CANDIDATES, local_search, keyword_search,
+                                   get_bm25_index, category_counts)
+from vectorstore.filters import make_filters, filter_key
+from vectorstore import azure_search
+from pipelines.context_builder import build_context, chunk_text
+from api.stages import (EMBED_TIMEOUT, SEARCH_TIMEOUT, LLM_TIMEOUT, classify_intent,
+                        run_stage, start_stage, wait_stage, run_stage_sync, merge_results)
+from monitoring import metrics
+from monitoring.metrics import stage, observe, record_usage
+from core.clients import (get_openai_client, get_search_client, create_async_openai_client,
+                          create_async_search_client)
 
 load_dotenv('config/.env')
 
+# Async mode serves requests on the event loop with async clients; otherwise
+# the sync clients run in a worker thread pool. Either way at most
+# API_MAX_CONCURRENCY requests are in flight, sharing API_HTTP_POOL_SIZE
+# connections per upstream service.
+ASYNC_MODE = os.getenv("API_ASYNC_MODE", "true").lower() == "true"
+MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "64"))
+HTTP_POOL_SIZE = int(os.getenv("API_HTTP_POOL_SIZE", "32"))
+
+# "rag" answers with search + completion here, "graph" runs the
+# retrieval/validation/response agents in graph/agent_graph.py
+QUERY_ENGINE = os.getenv("QUERY_ENGINE", "rag")
+
+# Questions of one /query/batch request answered at once; each still takes a
+# slot under the limits above
+BATCH_CONCURRENCY = int(os.getenv("API_BATCH_CONCURRENCY", "8"))
+
+@asynccontextmanager
+async def lifespan(app):
+    """Create the shared connection pools once per process and start warming up"""
+    app.state.thread_limiter = anyio.CapacityLimiter(MAX_CONCURRENCY)
+    app.state.request_limiter = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    if ASYNC_MODE:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE,
+                                max_keepalive_connections=HTTP_POOL_SIZE),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        app.state.async_client = create_async_openai_client(http_client)
+
+    # Only the Azure retriever searches with the async client; local and
+    # hybrid deployments need no Azure AI Search settings at all
+    search_session = None
+    if ASYNC_MODE and RETRIEVER == "azure":
+        search_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE)
+        )
+        try:
+            app.state.async_search_client = create_async_search_client(search_session)
+        except Exception:
+            await search_session.close()
+            await app.state.async_client.close()
+            raise
+
+    # Warm up in the background so the server starts listening (and /health
+    # answers) right away; /ready reports when it is done
+    app.state.warmup = warmup.new_progress()
+    warmup_task = asyncio.create_task(warmup.warm_up(warmup_steps(), app.state.warmup))
+
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        if search_session is not None:
+            await app.state.async_search_client.close()
+            await search_session.close()
+        if ASYNC_MODE:
+            await app.state.async_client.close()
+
 app = FastAPI(
     title="Healthcare RAG API",
     description="Medicare FAQ System powered by Azure OpenAI and RAG",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+metrics.register_cache("query_embedding", query_cache.cache_stats)
+metrics.register_cache("answer", answer_cache.cache_stats)
+
+class RequestTimer:
+    """End to end latency per endpoint, up to the first body chunk sent, so
+    streamed responses are timed to their first byte.
+
+    A plain ASGI middleware: one built on call_next only sees a streamed
+    response before any of its body has been produced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        timed = False
+
+        def observe_request():
+            # Label by route template, so unknown paths cannot blow up the label set
+            route = scope.get("route")
+            metrics.REQUEST_SECONDS.labels(route.path if route else "unmatched").observe(
+                time.perf_counter() - start
+            )
+
+        async def timed_send(message):
+            nonlocal timed
+            if message["type"] == "http.response.body" and not timed:
+                timed = True
+                observe_request()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            # Failed before sending a body
+            if not timed:
+                observe_request()
+
+app.add_middleware(RequestTimer)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,20 +152,14 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
-
-search_client = SearchClient(
-    endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
-    index_name=os.getenv("AZURE_SEARCH_INDEX"),
-    credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY"))
-)
-
 class QueryRequest(BaseModel):
     question: str
+    # Only search chunks in this category / updated on or after this date
+    category: Optional[str] = None
+    updated_after: Optional[date] = None
+
+    def filters(self):
+        return make_filters(self.category, self.updated_after)
 
 class QueryResponse(BaseModel):
     question: str
@@ -47,82 +167,536 @@ class QueryResponse(BaseModel):
     sources: list
     confidence: str
 
-def search_chunks(query):
-    """Search using Azure AI Search"""
-    response = client.embeddings.create(
-        input=query,
-        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    )
-    embedding = response.data[0].embedding
+async def akeyword_search(query, filters=None):
+    """Full-text half of hybrid search; needs no query embedding"""
+    if RETRIEVER != "azure":
+        return await anyio.to_thread.run_sync(
+            lambda: keyword_search(query, HYBRID_CANDIDATES, filters=filters)
+        )
 
-    vector_query = VectorizedQuery(
-        vector=embedding,
-        k_nearest_neighbors=3,
-        fields="embedding"
+    results = await app.state.async_search_client.search(
+        **azure_search.keyword_query(query, HYBRID_CANDIDATES, filters)
     )
+    return [azure_search.search_result(r) async for r in results]
+
+async def avector_search(query, embedding, filters=None):
+    """Vector half of hybrid search"""
+    if RETRIEVER != "azure":
+        return await anyio.to_thread.run_sync(
+            lambda: local_search(query, top_k=HYBRID_CANDIDATES, embedding=embedding, mode="local",
+                                 filters=filters)
+        )
 
-    results = search_client.search(
-        search_text=query,
-        vector_queries=[vector_query],
-        top=3
+    results = await app.state.async_search_client.search(
+        **azure_search.vector_query(embedding, HYBRID_CANDIDATES, filters)
     )
+    return [azure_search.search_result(r, vector=True) async for r in results]
+
+def search_keywords(query, filters=None):
+    """Sync akeyword_search"""
+    if RETRIEVER != "azure":
+        return keyword_search(query, HYBRID_CANDIDATES, filters=filters)
+    return azure_search.keyword_search(query, HYBRID_CANDIDATES, filters)
+
+def search_vectors(query, embedding, filters=None):
+    """Sync avector_search"""
+    if RETRIEVER != "azure":
+        return local_search(query, top_k=HYBRID_CANDIDATES, embedding=embedding, mode="local",
+                            filters=filters)
+    return azure_search.vector_search(embedding, HYBRID_CANDIDATES, filters)
+
+async def aretrieve(query, timings, filters=None):
+    """Embed, check the answer cache and search, overlapping what can overlap.
 
-    return [{"content": r["content"], "category": r["category"]} for r in results]
+    The keyword search needs no embedding, so it starts straight away and
+    runs alongside the query embedding and then the vector search; a cache
+    hit cancels it. See merge_results for how the results combine. Searches,
+    and the cached answers considered, are limited to filters. Returns
+    (embedding, chunks, cached response).
+    """
+    keyword_task = None
+    if RETRIEVER != "local":
+        keyword_task = asyncio.create_task(run_stage(
+            "keyword_search", akeyword_search(query, filters), SEARCH_TIMEOUT, timings, fallback=[]
+        ))
+
+    embedding = await run_stage("embed", aembed_query(query, app.state.async_client),
+                                EMBED_TIMEOUT, timings)
+    vector = None
+    if embedding is not None:
+        cached = answer_cache.lookup(embedding, filter_key(filters))
+        if cached:
+            if keyword_task:
+                keyword_task.cancel()
+            return embedding, [], cached
+        vector = await run_stage("vector_search", avector_search(query, embedding, filters),
+                                 SEARCH_TIMEOUT, timings)
+    keyword = await keyword_task if keyword_task else []
+    return embedding, merge_results(vector, keyword, keyword_task is not None, timings), None
+
+def retrieve(query, timings, filters=None):
+    """Sync aretrieve, with the same overlap, deadlines and fallbacks"""
+    keyword_stage = None
+    if RETRIEVER != "local":
+        keyword_stage = start_stage("keyword_search", lambda: search_keywords(query, filters),
+                                    SEARCH_TIMEOUT)
+
+    embedding = run_stage_sync("embed", lambda: embed_query(query), EMBED_TIMEOUT, timings)
+    vector = None
+    if embedding is not None:
+        cached = answer_cache.lookup(embedding, filter_key(filters))
+        if cached:
+            if keyword_stage:
+                keyword_stage[0].cancel()
+            return embedding, [], cached
+        vector = run_stage_sync("vector_search", lambda: search_vectors(query, embedding, filters),
+                                SEARCH_TIMEOUT, timings)
+    keyword = wait_stage("keyword_search", keyword_stage, timings, fallback=[]) if keyword_stage else []
+    return embedding, merge_results(vector, keyword, keyword_stage is not None, timings), None
+
+def build_messages(query, chunks):
+    with stage("prompt_build"):
+        context, _, _ = build_context(chunks)
+    return [
+        {"role": "system", "content": "You are a Medicare healthcare assistant. Answer ONLY from the provided context. If not in context say 'I dont have information about that.'"},
+        {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}\n\nAnswer:"}
+    ]
 
 def generate_answer(query, chunks):
-    context = "\n\n".join([c["content"] for c in chunks])
-    response = client.chat.completions.create(
+    response = get_openai_client().chat.completions.create(
         model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-        messages=[
-            {"role": "system", "content": "You are a Medicare healthcare assistant. Answer ONLY from the provided context. If not in context say 'I dont have information about that.'"},
-            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}\n\nAnswer:"}
-        ],
+        messages=build_messages(query, chunks),
         temperature=0.1,
         max_tokens=500
     )
+    record_usage(response.usage)
     return response.choices[0].message.content
 
+async def agenerate_answer(query, chunks):
+    response = await app.state.async_client.chat.completions.create(
+        model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        messages=build_messages(query, chunks),
+        temperature=0.1,
+        max_tokens=500
+    )
+    record_usage(response.usage)
+    return response.choices[0].message.content
+
+def stream_options():
+    return {"stream_options": {"include_usage": True}} if metrics.STREAM_USAGE else {}
+
+def generate_answer_stream(query, chunks):
+    """Yield completion tokens as they arrive"""
+    messages = build_messages(query, chunks)
+    start = time.perf_counter()
+    stream = get_openai_client().chat.completions.create(
+        model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        messages=messages,
+        temperature=0.1,
+        max_tokens=500,
+        stream=True,
+        **stream_options()
+    )
+    for chunk in stream:
+        # Azure sends a leading chunk with content filter results and no choices,
+        # and with include_usage a trailing one carrying only usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+        record_usage(getattr(chunk, "usage", None))
+    observe("generate", time.perf_counter() - start)
+
+async def agenerate_answer_stream(query, chunks):
+    """Yield completion tokens as they arrive, with the async client"""
+    messages = build_messages(query, chunks)
+    start = time.perf_counter()
+    stream = await app.state.async_client.chat.completions.create(
+        model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        messages=messages,
+        temperature=0.1,
+        max_tokens=500,
+        stream=True,
+        **stream_options()
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+        record_usage(getattr(chunk, "usage", None))
+    observe("generate", time.perf_counter() - start)
+
+CANNED_ANSWERS = {
+    "greeting": "Hello! 👋 I'm your Medicare Assistant. Ask me about Medicare eligibility, coverage, costs, and more!",
+    "thanks": "You're welcome! Let me know if you have any other Medicare questions.",
+    "empty": "Please ask a question about Medicare eligibility, coverage, costs, or enrollment."
+}
+
+def greeting_response(request):
+    """Canned reply for greetings, thanks and empty messages, or None for real questions"""
+    intent = classify_intent(request.question)
+    if intent not in CANNED_ANSWERS:
+        return None
+    return QueryResponse(
+        question=request.question,
+        answer=CANNED_ANSWERS[intent],
+        sources=["Healthcare Assistant"],
+        confidence="high"
+    )
+
+def no_answer_response(request):
+    """Reply when nothing retrieved is relevant enough to answer from"""
+    return QueryResponse(
+        question=request.question,
+        answer="I dont have information about that.",
+        sources=[],
+        confidence="low"
+    )
+
+def answer_question(request):
+    """Answer a question with the sync clients"""
+    greeting = greeting_response(request)
+    if greeting:
+        return greeting
+
+    timings = {}
+    filters = request.filters()
+    embedding, chunks, cached = retrieve(request.question, timings, filters)
+    if cached:
+        return cached.model_copy(update={"question": request.question})
+    if not chunks:
+        return no_answer_response(request)
+
+    answer = run_stage_sync("generate", lambda: generate_answer(request.question, chunks),
+                            LLM_TIMEOUT, timings)
+    if answer is None:
+        return fallback_response(request, chunks)
+    return answered(request, answer, chunks, embedding, timings, filters)
+
+def answer_with_graph(request):
+    """Answer a question with the multi agent graph"""
+    greeting = greeting_response(request)
+    if greeting:
+        return greeting
+
+    filters = request.filters()
+    embedding = embed_query(request.question)
+    cached = answer_cache.lookup(embedding, filter_key(filters))
+    if cached:
+        return cached.model_copy(update={"question": request.question})
+
+    # Only the graph engine needs langgraph, so it is imported on first use
+    from graph.agent_graph import run_agent
+    result = run_agent(request.question, filters)
+    response = QueryResponse(
+        question=request.question,
+        answer=result["final_answer"] or "I don't have enough information to answer that question.",
+        sources=result["sources"],
+        confidence="high" if result["validation_passed"] else "low"
+    )
+    answer_cache.store(embedding, response, filter_key(filters))
+    return response
+
+def fallback_response(request, chunks):
+    """Reply with the best retrieved passage when the completion times out"""
+    return QueryResponse(
+        question=request.question,
+        answer=chunk_text(chunks[0]),
+        sources=[chunks[0]['category']],
+        confidence="low"
+    )
+
+def answered(request, answer, chunks, embedding, timings, filters):
+    """Response for a generated answer, cached for similar questions.
+
+    Answers from the keyword-only fallback skipped the relevance gate:
+    they are flagged low confidence and kept out of the cache.
+    """
+    degraded = embedding is None or "vector_search" in timings.get("failed", [])
+    response = QueryResponse(
+        question=request.question,
+        answer=answer,
+        sources=list(set([c['category'] for c in chunks])),
+        confidence="low" if degraded else "high"
+    )
+    if not degraded:
+        answer_cache.store(embedding, response, filter_key(filters))
+    return response
+
+async def aanswer_question(request):
+    """Answer a question with the async clients"""
+    greeting = greeting_response(request)
+    if greeting:
+        return greeting
+
+    timings = {}
+    filters = request.filters()
+    embedding, chunks, cached = await aretrieve(request.question, timings, filters)
+    if cached:
+        return cached.model_copy(update={"question": request.question})
+    if not chunks:
+        return no_answer_response(request)
+
+    answer = await run_stage("generate", agenerate_answer(request.question, chunks),
+                             LLM_TIMEOUT, timings)
+    if answer is None:
+        return fallback_response(request, chunks)
+    return answered(request, answer, chunks, embedding, timings, filters)
+
+def response_events(response):
+    """Stream events for an answer that is already complete"""
+    yield {"type": "sources", "sources": response.sources}
+    yield {"type": "token", "content": response.answer}
+    yield {"type": "done", "confidence": response.confidence}
+
+def stream_events(request):
+    """Events for a streamed answer: sources first, then tokens, then done.
+    The LLM timeout applies to the first token."""
+    greeting = greeting_response(request)
+    if greeting:
+        for event in response_events(greeting):
+            yield event
+        return
+
+    timings = {}
+    filters = request.filters()
+    embedding, chunks, cached = retrieve(request.question, timings, filters)
+    if cached or not chunks:
+        for event in response_events(cached or no_answer_response(request)):
+            yield event
+        return
+
+    sources = list(set([c['category'] for c in chunks]))
+    yield {"type": "sources", "sources": sources}
+
+    stream = generate_answer_stream(request.question, chunks)
+    first = run_stage_sync("first_token", lambda: next(stream), LLM_TIMEOUT, timings)
+    if first is None:
+        # Sources are already out; finish with the best passage instead
+        fallback = fallback_response(request, chunks)
+        yield {"type": "token", "content": fallback.answer}
+        yield {"type": "done", "confidence": fallback.confidence}
+        return
+
+    tokens = [first]
+    yield {"type": "token", "content": first}
+    for token in stream:
+        tokens.append(token)
+        yield {"type": "token", "content": token}
+
+    response = answered(request, "".join(tokens), chunks, embedding, timings, filters)
+    yield {"type": "done", "confidence": response.confidence}
+
+async def astream_events(request):
+    """Async stream_events; the LLM timeout applies to the first token"""
+    greeting = greeting_response(request)
+    if greeting:
+        for event in response_events(greeting):
+            yield event
+        return
+
+    timings = {}
+    filters = request.filters()
+    embedding, chunks, cached = await aretrieve(request.question, timings, filters)
+    if cached or not chunks:
+        for event in response_events(cached or no_answer_response(request)):
+            yield event
+        return
+
+    sources = list(set([c['category'] for c in chunks]))
+    yield {"type": "sources", "sources": sources}
+
+    stream = agenerate_answer_stream(request.question, chunks)
+    first = await run_stage("first_token", stream.__anext__(), LLM_TIMEOUT, timings)
+    if first is None:
+        # Sources are already out; finish with the best passage instead
+        await stream.aclose()
+        fallback = fallback_response(request, chunks)
+        yield {"type": "token", "content": fallback.answer}
+        yield {"type": "done", "confidence": fallback.confidence}
+        return
+
+    tokens = [first]
+    yield {"type": "token", "content": first}
+    async for token in stream:
+        tokens.append(token)
+        yield {"type": "token", "content": token}
+
+    response = answered(request, "".join(tokens), chunks, embedding, timings, filters)
+    yield {"type": "done", "confidence": response.confidence}
+
+async def open_connections():
+    """A few concurrent cheap calls per upstream service, so the pools start
+    out holding connections that are already through the TLS handshake"""
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+
+    if ASYNC_MODE and QUERY_ENGINE == "rag":
+        async def ping():
+            await app.state.async_client.embeddings.create(input=["warm-up"], model=deployment)
+            if RETRIEVER == "azure":
+                results = await app.state.async_search_client.search(
+                    search_text="*", select=["id"], top=1
+                )
+                [r async for r in results]
+    else:
+        def sync_ping():
+            get_openai_client().embeddings.create(input=["warm-up"], model=deployment)
+            if RETRIEVER == "azure" or QUERY_ENGINE == "graph":
+                list(get_search_client().search(search_text="*", select=["id"], top=1))
+
+        async def ping():
+            await anyio.to_thread.run_sync(sync_ping, limiter=app.state.thread_limiter)
+
+    await asyncio.gather(*(ping() for _ in range(warmup.WARMUP_CONCURRENCY)))
+
+def load_local_index():
+    """Map the FAISS index and metadata, and build BM25 for hybrid search"""
+    from vectorstore.vector_store import get_vector_store
+    _, chunks = get_vector_store()
+    if RETRIEVER == "hybrid":
+        get_bm25_index(chunks)
+
+def warmup_steps():
+    """(name, coroutine function) steps for warmup.warm_up, for this configuration"""
+    questions = warmup.load_questions()
+    steps = [("connections", open_connections)]
+    if RETRIEVER != "azure":
+        steps.append(("index", lambda: anyio.to_thread.run_sync(load_local_index)))
+    if questions:
+        steps.append(("query_embeddings", lambda: anyio.to_thread.run_sync(embed_queries, questions)))
+    if questions and warmup.WARMUP_ANSWERS and answer_cache.ANSWER_CACHE_ENABLED:
+        steps.append(("answers", lambda: warmup.answer_all(
+            questions, lambda q: answer_query(QueryRequest(question=q)), app.state.warmup
+        )))
+    return steps
+
 @app.get("/")
 def home():
     return {"message": "Healthcare RAG API is running!", "version": "1.0.0"}
 
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: stage latencies, LLM token usage and cache hit rates"""
+    body, content_type = metrics.content()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 def health_check():
+    """Liveness: the process is up, whether or not it has warmed up"""
     return {"status": "healthy"}
 
-@app.post("/query", response_model=QueryResponse)
-def query_healthcare(request: QueryRequest):
-    try:
-        question = request.question.lower().strip()
-
-        greetings = ["hi", "hello", "hey", "good morning", "good evening"]
-        if any(g in question for g in greetings):
-            return QueryResponse(
-                question=request.question,
-                answer="Hello! 👋 I'm your Medicare Assistant. Ask me about Medicare eligibility, coverage, costs, and more!",
-                sources=["Healthcare Assistant"],
-                confidence="high"
-            )
-
-        chunks = search_chunks(request.question)
-        answer = generate_answer(request.question, chunks)
-        sources = list(set([c['category'] for c in chunks]))
+@app.get("/ready")
+def readiness_check():
+    """Readiness: 503 with the warm-up progress until warm-up has finished"""
+    progress = app.state.warmup
+    return JSONResponse(progress, status_code=200 if warmup.is_ready(progress) else 503)
 
-        return QueryResponse(
-            question=request.question,
-            answer=answer,
-            sources=sources,
-            confidence="high"
+async def answer_query(request):
+    """Answer with the configured engine, in async mode or on the thread pool"""
+    if QUERY_ENGINE == "graph":
+        return await anyio.to_thread.run_sync(
+            answer_with_graph, request, limiter=app.state.thread_limiter
         )
+    if ASYNC_MODE:
+        async with app.state.request_limiter:
+            return await aanswer_question(request)
+    return await anyio.to_thread.run_sync(
+        answer_question, request, limiter=app.state.thread_limiter
+    )
 
+@app.post("/query", response_model=QueryResponse)
+async def query_healthcare(request: QueryRequest):
+    try:
+        return await answer_query(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def query_healthcare_stream(request: QueryRequest):
+    """Stream the answer as NDJSON events (sources, token..., done).
+
+    The graph engine does not stream its response agent, so with
+    QUERY_ENGINE=graph the whole answer arrives as a single token event.
+    """
+    async def ndjson():
+        try:
+            if QUERY_ENGINE == "graph":
+                response = await answer_query(request)
+                for event in response_events(response):
+                    yield json.dumps(event) + "\n"
+            elif ASYNC_MODE:
+                async with app.state.request_limiter:
+                    async for event in astream_events(request):
+                        yield json.dumps(event) + "\n"
+            else:
+                events = stream_events(request)
+                while True:
+                    event = await anyio.to_thread.run_sync(
+                        next, events, None, limiter=app.state.thread_limiter
+                    )
+                    if event is None:
+                        break
+                    yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/query/batch")
+async def query_healthcare_batch(request: Request):
+    """Answer a JSONL body of questions, streaming JSONL results as they complete.
+
+    Each question goes through the same path as /query (engine, retriever,
+    answer cache and relevance gate), a few at a time.
+    """
+    body = (await request.body()).decode("utf-8")
+    limiter = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def answer(position, record_id, question):
+        if isinstance(question, Exception):
+            return {"index": position, "id": record_id, "query": None,
+                    "sources": [], "answer": None, "error": str(question)}
+        result = {"index": position, "id": record_id, "query": question}
+        async with limiter:
+            try:
+                response = await answer_query(QueryRequest(question=question))
+                result.update(sources=response.sources, answer=response.answer,
+                              confidence=response.confidence)
+            except Exception as e:
+                result.update(sources=[], answer=None, error=str(e))
+        return result
+
+    async def jsonl():
+        tasks = [asyncio.create_task(answer(*question))
+                 for question in read_questions(body.splitlines())]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield json.dumps(await task) + "\n"
+        finally:
+            # Client went away: stop answering the rest
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(jsonl(), media_type="application/x-ndjson")
+
 @app.get("/categories")
 def get_categories():
-    return {"categories": ["Medicare Eligibility", "Medicare Parts", "Medicare Cost", "Enrollment", "Prescription Drugs"]}
+    """Categories in the search index, with how many chunks each holds"""
+    if RETRIEVER == "azure":
+        # An index created before category was facetable rejects the facet
+        # request or returns no facets, until it is recreated
+        try:
+            results = get_search_client().search(search_text="*", facets=["category,count:1000"], top=0)
+            facets = (results.get_facets() or {}).get("category")
+        except HttpResponseError:
+            facets = None
+        if facets is None:
+            raise HTTPException(status_code=503, detail=(
+                "The search index does not facet categories; recreate it with "
+                "python pipelines/azure_search_pipeline.py --recreate"))
+        counts = {f["value"]: f["count"] for f in facets}
+    else:
+        counts = category_counts()
+    return {"categories": sorted(counts), "counts": counts}
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=port)
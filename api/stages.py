@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from monitoring.metrics import stage
+from agents.validation_agent import relevant_chunks
+from vectorstore.retriever import RRF_K
+
+load_dotenv('config/.env')
+
+# Per-stage timeouts for /query, in seconds
+EMBED_TIMEOUT = float(os.getenv("STAGE_EMBED_TIMEOUT", "3"))
+SEARCH_TIMEOUT = float(os.getenv("STAGE_SEARCH_TIMEOUT", "3"))
+LLM_TIMEOUT = float(os.getenv("STAGE_LLM_TIMEOUT", "30"))
+
+# Threads running the sync path's stages, so a request can stop waiting on
+# one at its deadline; an abandoned stage keeps its thread until it returns
+STAGE_THREADS = int(os.getenv("STAGE_THREADS", "64"))
+_stage_pool = ThreadPoolExecutor(max_workers=STAGE_THREADS, thread_name_prefix="stage")
+
+GREETINGS = {"hi", "hello", "hey", "hiya", "howdy", "greetings", "good morning",
+             "good afternoon", "good evening"}
+THANKS = {"thanks", "thank you", "thx", "ty", "cheers"}
+WORD_PATTERN = re.compile(r"[a-z']+")
+
+def classify_intent(question):
+    """Cheap pre-check, before any network I/O: "empty", "greeting", "thanks" or "rag".
+
+    Only short messages made up of a greeting or thanks (plus filler words)
+    skip retrieval, so "is this covered?" is not mistaken for "hi".
+    """
+    words = WORD_PATTERN.findall(question.lower())
+    if not words:
+        return "empty"
+    if len(words) > 5:
+        return "rag"
+
+    text = " ".join(words)
+    for intent, phrases in (("greeting", GREETINGS), ("thanks", THANKS)):
+        for phrase in phrases:
+            if text == phrase or text.startswith(phrase + " "):
+                rest = text[len(phrase):].split()
+                if all(w in {"there", "so", "much", "a", "lot", "again", "you", "all", "team"} for w in rest):
+                    return intent
+    return "rag"
+
+async def run_stage(name, awaitable, timeout, timings, fallback=None):
+    """Await one pipeline stage under its timeout, recording how long it took
+    in timings and in the stage metrics.
+
+    On timeout or error the stage's fallback value is returned and the
+    stage name is added to timings["failed"].
+    """
+    start = time.perf_counter()
+    try:
+        with stage(name):
+            return await asyncio.wait_for(awaitable, timeout)
+    except Exception as e:
+        print(f"Stage {name} failed ({type(e).__name__}: {e}), using fallback")
+        timings.setdefault("failed", []).append(name)
+        return fallback
+    finally:
+        timings[name] = time.perf_counter() - start
+
+def start_stage(name, fn, timeout):
+    """Start fn() as a sync pipeline stage on the stage threads; finish it
+    with wait_stage, e.g. after overlapping it with other work"""
+    def timed():
+        with stage(name):
+            return fn()
+    context = contextvars.copy_context()
+    return _stage_pool.submit(context.run, timed), time.perf_counter() + timeout
+
+def wait_stage(name, started, timings, fallback=None):
+    """Wait for a started stage until its deadline, like run_stage"""
+    future, deadline = started
+    start = time.perf_counter()
+    try:
+        return future.result(timeout=max(0.0, deadline - start))
+    except Exception as e:
+        future.cancel()
+        print(f"Stage {name} failed ({type(e).__name__}: {e}), using fallback")
+        timings.setdefault("failed", []).append(name)
+        return fallback
+    finally:
+        timings[name] = time.perf_counter() - start
+
+def run_stage_sync(name, fn, timeout, timings, fallback=None):
+    """run_stage for blocking code: fn() under the timeout, fallback on failure"""
+    return wait_stage(name, start_stage(name, fn, timeout), timings, fallback)
+
+def fuse_results(rankings, top_k, rrf_k=60):
+    """Merge ranked result lists by chunk_id with reciprocal rank fusion"""
+    fused = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            entry = fused.setdefault(result["chunk_id"], {**result, "score": 0.0})
+            for key, value in result.items():
+                if entry.get(key) is None:
+                    entry[key] = value
+            entry["score"] += 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.values(), key=lambda r: r["score"], reverse=True)[:top_k]
+
+def merge_results(vector, keyword, hybrid, timings=None):
+    """Chunks to answer from, given one query's vector and keyword results.
+
+    The vector results are gated on relevance and then fused with the
+    keyword results; if vector search did not run or failed (vector is
+    None), the keyword results are used alone.
+    """
+    if vector is None:
+        failed = (timings or {}).get("failed", [])
+        if not hybrid or "keyword_search" in failed:
+            raise RuntimeError("Retrieval failed: " + ", ".join(failed))
+        return keyword[:3]
+
+    # Retrievals with nothing relevant enough are not answered from keyword hits
+    relevant = relevant_chunks(vector)
+    if not relevant:
+        return []
+    if not hybrid:
+        return relevant[:3]
+    return fuse_results([relevant, keyword], top_k=3, rrf_k=RRF_K)
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import sys
+import time
+from dotenv import load_dotenv
+sys.path.append('.')
+from pipelines.questions import read_questions
+
+load_dotenv('config/.env')
+
+# Work done at startup, before /ready reports the instance as ready: open the
+# upstream connections, load the local index and fill the query-embedding and
+# answer caches from the most frequent questions (any JSONL that
+# pipelines/questions.py reads, e.g. an export of recent queries).
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_QUESTIONS_PATH = os.getenv("WARMUP_QUESTIONS_PATH", "data/eval/retrieval_eval.jsonl")
+WARMUP_MAX_QUESTIONS = int(os.getenv("WARMUP_MAX_QUESTIONS", "50"))
+# Pre-answering costs one completion per question; off keeps only the embeddings warm
+WARMUP_ANSWERS = os.getenv("WARMUP_ANSWERS", "true").lower() == "true"
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+# Past this the instance reports ready anyway, rather than never joining the pool
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "300"))
+
+# Warm-up finished, possibly with failed steps; either way traffic is accepted
+READY_STATUSES = ("ready", "degraded", "disabled")
+
+def new_progress():
+    """Warm-up progress as reported by /ready"""
+    return {"status": "starting", "step": None, "steps": {},
+            "questions": {"total": 0, "answered": 0}, "seconds": 0.0}
+
+def is_ready(progress):
+    return progress["status"] in READY_STATUSES
+
+def load_questions(path=WARMUP_QUESTIONS_PATH, limit=WARMUP_MAX_QUESTIONS):
+    """The first `limit` distinct questions in the file, [] if there is none"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        questions = dict.fromkeys(question for _, _, question in read_questions(f)
+                                  if not isinstance(question, Exception))
+    return list(questions)[:limit]
+
+async def answer_all(questions, answer, progress, concurrency=WARMUP_CONCURRENCY):
+    """Run answer(question) for every question, a few at a time"""
+    limiter = asyncio.Semaphore(concurrency)
+    progress["questions"]["total"] = len(questions)
+
+    async def one(question):
+        async with limiter:
+            try:
+                await answer(question)
+            except Exception as e:
+                print(f"⚠️ Warm-up answer failed for {question!r}: {e}")
+            progress["questions"]["answered"] += 1
+
+    await asyncio.gather(*(one(q) for q in questions))
+
+async def warm_up(steps, progress, timeout=WARMUP_TIMEOUT):
+    """Run the (name, coroutine function) steps in order, recording progress.
+
+    A failed step is recorded and skipped so the rest still run; the
+    instance then reports "degraded" instead of "ready". Steps still
+    pending when the timeout runs out are marked "timed_out".
+    """
+    if not WARMUP_ENABLED:
+        progress["status"] = "disabled"
+        return
+
+    progress["status"] = "warming"
+    for name, _ in steps:
+        progress["steps"][name] = {"status": "pending"}
+
+    start = time.perf_counter()
+    failed = False
+    for name, run in steps:
+        remaining = timeout - (time.perf_counter() - start)
+        if remaining <= 0:
+            progress["steps"][name]["status"] = "timed_out"
+            failed = True
+            continue
+
+        progress["step"] = name
+        step = progress["steps"][name]
+        step["status"] = "running"
+        step_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(run(), remaining)
+            step["status"] = "done"
+        except asyncio.TimeoutError:
+            step["status"] = "timed_out"
+            failed = True
+        except Exception as e:
+            step.update(status="failed", error=str(e))
+            failed = True
+        step["seconds"] = round(time.perf_counter() - step_start, 3)
+        print(f"🔥 Warm-up {name}: {step['status']} in {step['seconds']:.2f}s")
+
+    progress["step"] = None
+    progress["seconds"] = round(time.perf_counter() - start, 3)
+    progress["status"] = "degraded" if failed else "ready"
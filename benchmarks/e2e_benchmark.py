@@ -0,0 +1,235 @@
+# End-to-end throughput, latency percentiles and memory against local fakes
+# of Azure OpenAI and Azure AI Search (benchmarks/fake_azure.py):
+#   python benchmarks/e2e_benchmark.py --target api --concurrency 16 --requests 400
+#   python benchmarks/e2e_benchmark.py --target api --stream --llm-latency 0.5
+#   python benchmarks/e2e_benchmark.py --target rag --concurrency 8
+#   python benchmarks/e2e_benchmark.py --target graph --retriever hybrid --json
+# Runs happen in a scratch directory holding a vector store built from the
+# fake embeddings, so nothing under data/ is touched. The answer cache is off
+# unless --cache is given, so repeated questions still do the full work.
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+
+from fake_azure import start_server, load_documents, add_latency_arguments
+from memory_report import memory_usage
+
+def configure_environment(endpoint, args):
+    """Point every client at the fakes; must run before the app modules are imported"""
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": endpoint,
+        "AZURE_OPENAI_API_KEY": "fake",
+        "AZURE_OPENAI_API_VERSION": "2024-10-21",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "fake-chat",
+        "AZURE_OPENAI_EMBEDDING_DEPLOYMENT": "fake-embedding",
+        "AZURE_SEARCH_ENDPOINT": endpoint,
+        "AZURE_SEARCH_KEY": "fake",
+        "AZURE_SEARCH_INDEX": "fake-index",
+        "RETRIEVER": args.retriever,
+        "ANSWER_CACHE_ENABLED": "true" if args.cache else "false",
+        "QUERY_EMBEDDING_CACHE_PATH": "",
+        "EMBEDDING_CACHE_PATH": "data/embeddings/embedding_cache.npz",
+    })
+
+def build_store(chunks_path):
+    """Embed the chunks with the fake service into ./data/embeddings"""
+    from pipelines.embedding_pipeline import load_chunks, build_vector_store, save_vector_store
+    index, chunks = build_vector_store(load_chunks(chunks_path))
+    save_vector_store(index, chunks)
+
+def load_questions(path, chunks_path, count):
+    """count questions, cycled from a JSONL file or the chunks' own questions"""
+    if path:
+        from pipelines.questions import read_questions
+        with open(path) as f:
+            questions = [question for _, _, question in read_questions(f)
+                         if not isinstance(question, Exception)]
+    else:
+        from pipelines.streaming import iter_json_records
+        questions = [chunk["text"].split("\n")[0].replace("Question: ", "")
+                     for chunk, _ in iter_json_records(chunks_path)]
+    return [questions[i % len(questions)] for i in range(count)]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def run_threaded(fn, questions, concurrency):
+    """Call fn(question) from a thread pool; returns (latencies, [], errors)"""
+    def timed(question):
+        start = time.perf_counter()
+        fn(question)
+        return time.perf_counter() - start
+
+    latencies, errors = [], 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(timed, q) for q in questions]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    return latencies, [], errors
+
+async def run_http(base_url, questions, concurrency, stream):
+    """POST each question to a running API; returns (latencies, first token times, errors)"""
+    import httpx
+
+    limiter = asyncio.Semaphore(concurrency)
+    latencies, first_tokens, errors = [], [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def one(question):
+            nonlocal errors
+            async with limiter:
+                start = time.perf_counter()
+                first_token = None
+                try:
+                    if stream:
+                        async with client.stream("POST", "/query/stream", json={"question": question}) as r:
+                            async for line in r.aiter_lines():
+                                event = json.loads(line) if line else {}
+                                if event.get("type") == "token" and first_token is None:
+                                    first_token = time.perf_counter() - start
+                                if event.get("type") == "error":
+                                    raise RuntimeError(event["detail"])
+                    else:
+                        r = await client.post("/query", json={"question": question})
+                        r.raise_for_status()
+                except Exception:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+                if first_token is not None:
+                    first_tokens.append(first_token)
+
+        await asyncio.gather(*(one(q) for q in questions))
+    return latencies, first_tokens, errors
+
+def start_api():
+    """Serve api.main with uvicorn in a background thread once it has warmed
+    up, returns (server, base url)"""
+    import httpx
+    import uvicorn
+    from api.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+    while httpx.get(f"{base_url}/ready").status_code == 503:
+        time.sleep(0.05)
+    return server, base_url
+
+def percentiles(values):
+    if not values:
+        return {}
+    ms = np.asarray(values) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)),
+            "p99": float(np.percentile(ms, 99)), "max": float(ms.max())}
+
+def run(args):
+    chunks_path = os.path.abspath(args.chunks)
+    questions_path = os.path.abspath(args.questions) if args.questions else None
+    fake, calls = start_server(0, load_documents(chunks_path), args.embed_latency,
+                               args.search_latency, args.llm_latency, args.token_latency,
+                               args.answer_tokens)
+    configure_environment(f"http://127.0.0.1:{fake.server_port}", args)
+
+    os.chdir(tempfile.mkdtemp(prefix="rag-bench-"))
+    questions = load_questions(questions_path, chunks_path, args.warmup + args.requests)
+    warmup, questions = questions[:args.warmup], questions[args.warmup:]
+
+    # The app modules print progress per query; keep the report readable
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        build_store(chunks_path)
+        if args.target == "api":
+            server, base_url = start_api()
+            asyncio.run(run_http(base_url, warmup, args.concurrency, args.stream))
+            calls.clear()
+            start = time.perf_counter()
+            latencies, first_tokens, errors = asyncio.run(
+                run_http(base_url, questions, args.concurrency, args.stream)
+            )
+        else:
+            if args.target == "rag":
+                from pipelines.rag_pipeline import rag_query as fn
+            else:
+                from graph.agent_graph import run_agent as fn
+            run_threaded(fn, warmup, args.concurrency)
+            calls.clear()
+            start = time.perf_counter()
+            latencies, first_tokens, errors = run_threaded(fn, questions, args.concurrency)
+        elapsed = time.perf_counter() - start
+        if args.target == "api":
+            server.should_exit = True
+
+    memory = memory_usage()
+    return {
+        "target": args.target,
+        "retriever": args.retriever,
+        "stream": args.stream,
+        "concurrency": args.concurrency,
+        "requests": len(questions),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": percentiles(latencies),
+        "first_token_ms": percentiles(first_tokens),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_mb": memory["Rss"],
+        "upstream_calls": dict(calls),
+    }
+
+def print_report(result):
+    print(f"\nTarget: {result['target']} (retriever={result['retriever']}, "
+          f"stream={result['stream']}, concurrency={result['concurrency']})")
+    print(f"Requests: {result['requests']} in {result['seconds']:.2f}s, {result['errors']} errors")
+    print(f"Throughput: {result['throughput']:.1f} req/s")
+    for name in ("latency_ms", "first_token_ms"):
+        if result[name]:
+            values = result[name]
+            print(f"{name.replace('_ms', '').replace('_', ' ').capitalize():<12} "
+                  f"p50 {values['p50']:8.1f} ms  p95 {values['p95']:8.1f} ms  "
+                  f"p99 {values['p99']:8.1f} ms  max {values['max']:8.1f} ms")
+    print(f"Memory: {result['rss_mb']:.1f} MB RSS, {result['peak_rss_mb']:.1f} MB peak")
+    print(f"Upstream calls: {result['upstream_calls']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against fake Azure services")
+    parser.add_argument("--target", choices=["api", "rag", "graph"], default="api",
+                        help="api: POST /query over HTTP; rag: rag_pipeline.rag_query; graph: run_agent")
+    parser.add_argument("--retriever", choices=["azure", "local", "hybrid"], default="azure")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests before the run")
+    parser.add_argument("--stream", action="store_true", help="use /query/stream (api only)")
+    parser.add_argument("--cache", action="store_true", help="leave the answer cache on")
+    parser.add_argument("--questions", help="JSONL questions (default: the chunks' questions)")
+    parser.add_argument("--chunks", default="data/processed/cms_faq_chunks.json")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
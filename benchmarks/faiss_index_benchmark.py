@@ -0,0 +1,79 @@
+# Recall and QPS of the approximate FAISS index types against the exact
+# flat index, on synthetic clustered corpora:
+#   python benchmarks/faiss_index_benchmark.py --sizes 10000,100000,1000000 --dim 1536
+import argparse
+import sys
+import time
+import numpy as np
+sys.path.append('.')
+from vectorstore.faiss_index import create_index, configure_index, index_type_name
+
+def synthetic_corpus(n, dim, n_queries, seed=0):
+    """Unit vectors drawn around random topic centres, plus held-out queries"""
+    rng = np.random.default_rng(seed)
+    n_centres = max(1, n // 100)
+    centres = rng.standard_normal((n_centres, dim)).astype('float32')
+
+    def sample(count):
+        points = centres[rng.integers(0, n_centres, count)]
+        points = points + 0.5 * rng.standard_normal((count, dim)).astype('float32')
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    return sample(n), sample(n_queries)
+
+def recall_at_k(found, expected):
+    """Mean fraction of the exact top-k present in the approximate top-k"""
+    k = expected.shape[1]
+    hits = [len(np.intersect1d(f, e)) for f, e in zip(found, expected)]
+    return float(np.mean(hits)) / k
+
+def timed_search(index, queries, k):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    return found, len(queries) / (time.perf_counter() - start)
+
+def run(sizes, dim, n_queries, k, index_types):
+    print(f"{'vectors':>9} {'index':>9} {'setting':>13} {'build s':>8} {'recall@' + str(k):>9} {'QPS':>10}")
+    for n in sizes:
+        vectors, queries = synthetic_corpus(n, dim, n_queries)
+
+        start = time.perf_counter()
+        flat = create_index(vectors, "flat")
+        build_time = time.perf_counter() - start
+        expected, qps = timed_search(flat, queries, k)
+        print(f"{n:>9} {'flat':>9} {'exact':>13} {build_time:>8.1f} {1.0:>9.3f} {qps:>10.0f}")
+        del flat
+
+        for index_type in index_types:
+            start = time.perf_counter()
+            index = create_index(vectors, index_type)
+            build_time = time.perf_counter() - start
+            if index_type_name(index) != index_type:
+                # Too few vectors to train it; create_index built a flat index instead
+                print(f"{n:>9} {index_type:>9} {'fell back':>13} {'-':>8} {'-':>9} {'-':>10}")
+                del index
+                continue
+
+            if index_type == "hnsw":
+                settings = [("efSearch", v, {"ef_search": v}) for v in (16, 64, 256)]
+            else:
+                settings = [("nprobe", v, {"nprobe": v}) for v in (1, 8, 32, 128)]
+
+            for name, value, kwargs in settings:
+                configure_index(index, **kwargs)
+                found, qps = timed_search(index, queries, k)
+                print(f"{n:>9} {index_type:>9} {name + '=' + str(value):>13} "
+                      f"{build_time:>8.1f} {recall_at_k(found, expected):>9.3f} {qps:>10.0f}")
+            del index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FAISS index recall/latency benchmark")
+    parser.add_argument("--sizes", default="10000,100000", help="comma separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-types", default="ivf_flat,ivf_pq,hnsw")
+    args = parser.parse_args()
+
+    run([int(s) for s in args.sizes.split(",")], args.dim, args.queries, args.k,
+        args.index_types.split(","))
@@ -0,0 +1,288 @@
+# Local stand-ins for Azure OpenAI (embeddings and chat completions, with
+# streaming) and Azure AI Search (search and document indexing), with
+# configurable latency, so the API and pipelines can be exercised and
+# benchmarked without network access:
+#   python benchmarks/fake_azure.py --port 8010 --llm-latency 0.5 --token-latency 0.02
+#   python benchmarks/fake_azure.py --port 8010 --empty-index --index-fail-every 3
+# then point AZURE_OPENAI_ENDPOINT and AZURE_SEARCH_ENDPOINT at http://127.0.0.1:8010
+import argparse
+import base64
+import json
+import operator
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+sys.path.append('.')
+from embeddings.stub_server import fake_embedding
+from vectorstore.bm25 import tokenize
+
+# "field op value" clauses joined by "and", the subset of OData the app sends
+FILTER_CLAUSE = re.compile(r"(\w+) (eq|ne|ge|gt|le|lt) ('(?:[^']|'')*'|\S+)")
+FILTER_OPS = {"eq": operator.eq, "ne": operator.ne, "ge": operator.ge, "gt": operator.gt,
+              "le": operator.le, "lt": operator.lt}
+
+def filter_predicate(expression):
+    """Document predicate for an OData $filter expression"""
+    clauses = []
+    for field, op, value in FILTER_CLAUSE.findall(expression or ""):
+        if value.startswith("'"):
+            value = value[1:-1].replace("''", "'")
+        clauses.append((field, FILTER_OPS[op], value))
+    return lambda document: all(document.get(field) is not None and op(document[field], value)
+                                for field, op, value in clauses)
+
+ANSWER = ("Medicare is federal health insurance for people 65 or older and for some "
+          "younger people with disabilities or end stage renal disease.")
+
+class SearchIndex:
+    """Documents held by the fake search service, searchable by text and vector
+    with OData filters and facets"""
+
+    def __init__(self, documents):
+        self.documents = {}
+        self.lock = threading.Lock()
+        self.index([{"@search.action": "upload", **d} for d in documents])
+
+    def index(self, actions):
+        """Apply upload/merge/delete actions, returning per-document results"""
+        results = []
+        with self.lock:
+            for action in actions:
+                kind = action.pop("@search.action", "upload")
+                key = action["id"]
+                if kind == "delete":
+                    self.documents.pop(key, None)
+                elif kind in ("merge", "mergeOrUpload") and key in self.documents:
+                    self.documents[key] = {**self.documents[key], **action}
+                else:
+                    self.documents[key] = action
+                results.append({"key": key, "status": True, "errorMessage": None,
+                                "statusCode": 200 if kind == "delete" else 201})
+            self._rebuild()
+        return results
+
+    def statistics(self):
+        """Document count and (approximate) storage size, as search.stats reports them"""
+        with self.lock:
+            return {"documentCount": len(self.documents), "vectorIndexSize": 0,
+                    "storageSize": sum(len(json.dumps(d)) for d in self.rows)}
+
+    def _rebuild(self):
+        documents = list(self.documents.values())
+        self.rows = [{k: v for k, v in d.items() if k != "embedding"} for d in documents]
+        self.vectors = (np.stack([np.asarray(d["embedding"], dtype='float32') if d.get("embedding")
+                                  else fake_embedding(d["content"]) for d in documents])
+                        if documents else np.empty((0, 0), dtype='float32'))
+        self.terms = [set(tokenize(d["content"])) for d in documents]
+
+    def search(self, body):
+        top = 50 if body.get("top") is None else body["top"]
+        select = body.get("select")
+        vector_queries = body.get("vectorQueries") or []
+        with self.lock:
+            rows, vectors, terms = self.rows, self.vectors, self.terms
+        allowed = np.array([filter_predicate(body.get("filter"))(row) for row in rows], dtype=bool)
+
+        if vector_queries and len(rows):
+            similarity = vectors @ np.asarray(vector_queries[0]["vector"], dtype='float32')
+            # As the service scores the cosine metric: 1 / (1 + cosine distance)
+            scores = 1 / (2 - similarity)
+        else:
+            query_terms = set(tokenize(body.get("search") or ""))
+            scores = np.array([len(query_terms & t) for t in terms], dtype='float32')
+            if body.get("search") in (None, "*"):
+                scores[:] = 1.0
+
+        ranked = [i for i in np.argsort(-scores) if scores[i] > 0 and allowed[i]][:top]
+        results = []
+        for i in ranked:
+            document = rows[i]
+            if select:
+                fields = select.split(",") if isinstance(select, str) else select
+                document = {k: v for k, v in document.items() if k in fields}
+            results.append({**document, "@search.score": float(scores[i])})
+
+        facets = {}
+        for facet in body.get("facets") or []:
+            field = facet.split(",")[0]
+            counts = {}
+            for row, keep in zip(rows, allowed):
+                if keep and row.get(field) is not None:
+                    counts[row[field]] = counts.get(row[field], 0) + 1
+            facets[field] = [{"value": v, "count": c} for v, c in
+                             sorted(counts.items(), key=lambda item: -item[1])]
+        return results, facets
+
+def load_documents(chunks_path):
+    """Search documents in the shape azure_search_pipeline uploads, minus vectors"""
+    from pipelines.streaming import iter_json_records
+    from vectorstore.filters import last_updated
+    return [{"id": chunk["chunk_id"], "content": chunk["text"], "category": chunk["category"],
+             "source": chunk["source"],
+             "last_updated": f"{last_updated(chunk)[:10]}T00:00:00Z" if last_updated(chunk) else None}
+            for chunk, _ in iter_json_records(chunks_path)]
+
+def make_handler(index, embed_latency, search_latency, llm_latency, token_latency, answer_tokens,
+                 index_fail_every=0):
+    counter = {}
+    lock = threading.Lock()
+    tokens = [word + " " for word in ANSWER.split()]
+    tokens = (tokens * (answer_tokens // len(tokens) + 1))[:answer_tokens]
+
+    class FakeAzureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if not path.endswith("/search.stats"):
+                return self._send(404, {"error": {"message": f"not found: {path}"}})
+            with lock:
+                counter["stats"] = counter.get("stats", 0) + 1
+            return self._send(200, index.statistics())
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            path = self.path.split("?")[0]
+
+            if path.endswith("/embeddings"):
+                endpoint = "embeddings"
+            elif path.endswith("/chat/completions"):
+                endpoint = "chat_stream" if body.get("stream") else "chat"
+            elif path.endswith("/docs/search.post.search"):
+                endpoint = "search"
+            elif path.endswith("/docs/search.index"):
+                endpoint = "index"
+            else:
+                return self._send(404, {"error": {"message": f"not found: {path}"}})
+            with lock:
+                counter[endpoint] = counter.get(endpoint, 0) + 1
+                fail = (endpoint == "index" and index_fail_every
+                        and counter[endpoint] % index_fail_every == 0)
+
+            if endpoint == "embeddings":
+                inputs = body.get("input", [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                time.sleep(embed_latency)
+                data = []
+                for i, text in enumerate(inputs):
+                    vector = fake_embedding(text)
+                    if body.get("encoding_format") == "base64":
+                        embedding = base64.b64encode(vector.tobytes()).decode()
+                    else:
+                        embedding = vector.tolist()
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+                usage = sum(len(t) // 4 + 1 for t in inputs)
+                return self._send(200, {"object": "list", "data": data, "model": "fake",
+                                        "usage": {"prompt_tokens": usage, "total_tokens": usage}})
+
+            if endpoint == "search":
+                time.sleep(search_latency)
+                results, facets = index.search(body)
+                payload = {"value": results}
+                if body.get("facets"):
+                    payload["@search.facets"] = facets
+                return self._send(200, payload)
+
+            if endpoint == "index":
+                time.sleep(search_latency)
+                if fail:
+                    return self._send(503, {"error": {"code": "ServiceUnavailable",
+                                                      "message": "Injected failure"}})
+                return self._send(200, {"value": index.index(body.get("value", []))})
+
+            prompt_tokens = sum(len(m.get("content") or "") // 4 + 1 for m in body.get("messages", []))
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                     "total_tokens": prompt_tokens + len(tokens)}
+            time.sleep(llm_latency)
+            if endpoint == "chat":
+                time.sleep(token_latency * len(tokens))
+                return self._send(200, {
+                    "id": "fake", "object": "chat.completion", "created": int(time.time()),
+                    "model": "fake", "usage": usage,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(tokens)}}]
+                })
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                self._chunk({"id": "fake", "object": "chat.completion.chunk", "created": 0,
+                             "model": "fake", "choices": [{"index": 0, "delta": {"content": token},
+                                                           "finish_reason": None}]})
+                time.sleep(token_latency)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._chunk({"id": "fake", "object": "chat.completion.chunk", "created": 0,
+                             "model": "fake", "choices": [], "usage": usage})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _chunk(self, payload):
+            self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+        def _write_chunk(self, raw):
+            self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+            self.wfile.flush()
+
+        def _send(self, status, payload):
+            raw = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeAzureHandler, counter
+
+def start_server(port=0, documents=(), embed_latency=0.02, search_latency=0.02,
+                 llm_latency=0.3, token_latency=0.01, answer_tokens=40, index_fail_every=0):
+    """Start the fake services in a background thread, returns (server, request counter).
+
+    The search index is server.search_index; index_fail_every makes every Nth
+    document upload request fail with a 503.
+    """
+    search_index = SearchIndex(documents)
+    handler, counter = make_handler(search_index, embed_latency, search_latency, llm_latency,
+                                    token_latency, answer_tokens, index_fail_every)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.search_index = search_index
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+def add_latency_arguments(parser):
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per embeddings request")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="seconds per search request")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds to the first completion token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds per completion token")
+    parser.add_argument("--answer-tokens", type=int, default=40, help="tokens per completion")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Azure OpenAI and Azure AI Search")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--chunks", default="data/processed/cms_faq_chunks.json",
+                        help="chunks served by the fake search index")
+    parser.add_argument("--empty-index", action="store_true", help="start with no documents indexed")
+    parser.add_argument("--index-fail-every", type=int, default=0,
+                        help="fail every Nth document upload request with a 503")
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    documents = [] if args.empty_index else load_documents(args.chunks)
+    server, _ = start_server(args.port, documents, args.embed_latency, args.search_latency,
+                             args.llm_latency, args.token_latency, args.answer_tokens,
+                             args.index_fail_every)
+    print(f"Fake Azure OpenAI and AI Search on http://127.0.0.1:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,92 @@
+# Resident memory per worker process with the vector store loaded, to
+# compare memory-mapped and private copies of the index and metadata:
+#   python benchmarks/memory_report.py --workers 8
+#   python benchmarks/memory_report.py --workers 8 --no-mmap
+#   python benchmarks/memory_report.py --workers 8 --synthetic 200000 --encoding float16
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append('.')
+
+def memory_usage(pid="self"):
+    """Rss, Pss (shared pages split between processes) and private anonymous memory, in MB"""
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss", "Anonymous"):
+                usage[name] = int(value.split()[0]) / 1024
+    return usage
+
+def worker(ready, done):
+    from vectorstore.vector_store import get_vector_store
+    index, chunks = get_vector_store()
+
+    # Touch every vector and a spread of metadata records, as real traffic would
+    queries = np.random.default_rng(0).standard_normal((8, index.d)).astype('float32')
+    index.search(queries, 10)
+    for i in range(0, len(chunks), max(1, len(chunks) // 100)):
+        chunks[i]
+
+    ready.set()
+    done.wait()
+
+def build_synthetic_store(n, dim, encoding):
+    """Write a random store of n vectors into a temp dir and chdir there"""
+    from vectorstore.faiss_index import create_index
+    from vectorstore.chunk_store import write_chunk_store
+    import faiss
+
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data/embeddings')
+    vectors = np.random.default_rng(0).standard_normal((n, dim)).astype('float32')
+    faiss.write_index(create_index(vectors, "flat", encoding=encoding), 'data/embeddings/faiss_index.bin')
+    chunks = [{"chunk_id": f"SYN{i}_chunk_1", "category": "Synthetic", "source": "synthetic",
+               "text": f"Question: synthetic question {i}?\nAnswer: " + "medicare " * 40}
+              for i in range(n)]
+    write_chunk_store(chunks, 'data/embeddings/chunks_metadata.jsonl',
+                      'data/embeddings/chunks_metadata.offsets.npy')
+    os.replace('data/embeddings/chunks_metadata.jsonl.tmp', 'data/embeddings/chunks_metadata.jsonl')
+    os.replace('data/embeddings/chunks_metadata.offsets.npy.tmp', 'data/embeddings/chunks_metadata.offsets.npy')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident memory per worker with the vector store loaded")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-mmap", action="store_true", help="load private copies instead of mapping")
+    parser.add_argument("--synthetic", type=int, default=0, help="use a random store of this many vectors")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--encoding", default="float32", help="float32 | float16 | int8 (synthetic only)")
+    args = parser.parse_args()
+
+    # Keep the repo importable in the workers after moving to a synthetic store
+    sys.path.insert(0, os.getcwd())
+    if args.synthetic:
+        build_synthetic_store(args.synthetic, args.dim, args.encoding)
+    os.environ["VECTOR_STORE_MMAP"] = "false" if args.no_mmap else "true"
+
+    context = multiprocessing.get_context("spawn")
+    done = context.Event()
+    workers = []
+    for _ in range(args.workers):
+        ready = context.Event()
+        process = context.Process(target=worker, args=(ready, done))
+        process.start()
+        workers.append((process, ready))
+    for _, ready in workers:
+        ready.wait()
+
+    print(f"mmap: {not args.no_mmap}")
+    print(f"{'worker':>8} {'RSS MB':>10} {'PSS MB':>10} {'private MB':>11}")
+    total_pss = 0.0
+    for process, _ in workers:
+        usage = memory_usage(process.pid)
+        total_pss += usage["Pss"]
+        print(f"{process.pid:>8} {usage['Rss']:>10.1f} {usage['Pss']:>10.1f} {usage['Anonymous']:>11.1f}")
+    print(f"Total PSS across {args.workers} workers: {total_pss:.1f} MB")
+
+    done.set()
+    for process, _ in workers:
+        process.join()
@@ -0,0 +1,163 @@
+# Offline retrieval quality and latency: recall@k, MRR and nDCG@k over a
+# labeled query set (question -> relevant chunk_ids), per retriever:
+#   python benchmarks/retrieval_eval.py --seed
+#   python benchmarks/retrieval_eval.py --retrievers faiss bm25 hybrid --k 10
+#   python benchmarks/retrieval_eval.py --retrievers faiss azure --json
+# --seed writes the labeled set from the processed chunks: each FAQ's own
+# question, labeled with every chunk cut from that FAQ. Edit or extend the
+# file with paraphrased questions for a harder set.
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+import numpy as np
+sys.path.append('.')
+
+EVAL_SET_PATH = 'data/eval/retrieval_eval.jsonl'
+CHUNKS_PATH = 'data/processed/cms_faq_chunks.json'
+RECALL_AT = (1, 3, 5, 10)
+
+def seed_eval_set(chunks_path=CHUNKS_PATH, output_path=EVAL_SET_PATH):
+    """One labeled query per source FAQ, from the question its chunks start with"""
+    from pipelines.streaming import iter_json_records
+
+    sources = OrderedDict()
+    for chunk, _ in iter_json_records(chunks_path):
+        source = sources.setdefault(chunk.get("source_id") or chunk["chunk_id"],
+                                    {"question": None, "relevant": []})
+        source["relevant"].append(chunk["chunk_id"])
+        first_line = chunk["text"].split("\n")[0]
+        if source["question"] is None and first_line.startswith("Question: "):
+            source["question"] = first_line[len("Question: "):]
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    count = 0
+    with open(output_path, 'w') as f:
+        for source_id, source in sources.items():
+            if source["question"]:
+                f.write(json.dumps({"id": source_id, **source}) + "\n")
+                count += 1
+    print(f"Wrote {count} labeled queries to {output_path}")
+
+def load_eval_set(path=EVAL_SET_PATH):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def relevance_matrix(retrieved, relevant, k):
+    """(queries x k) 0/1 matrix of which ranked results are relevant"""
+    matrix = np.zeros((len(retrieved), k), dtype='float32')
+    for row, (ids, labels) in enumerate(zip(retrieved, relevant)):
+        labels = set(labels)
+        hits = [rank for rank, chunk_id in enumerate(ids[:k]) if chunk_id in labels]
+        matrix[row, hits] = 1.0
+    return matrix
+
+def score(retrieved, relevant, k):
+    """Mean recall@k, MRR@k and nDCG@k over the query set, vectorized over queries"""
+    hits = relevance_matrix(retrieved, relevant, k)
+    n_relevant = np.array([len(labels) for labels in relevant], dtype='float32')
+
+    metrics = {}
+    cumulative = np.cumsum(hits, axis=1)
+    for cutoff in (c for c in RECALL_AT if c <= k):
+        metrics[f"recall@{cutoff}"] = float(np.mean(cumulative[:, cutoff - 1] / n_relevant))
+
+    first_hit = np.argmax(hits > 0, axis=1)
+    found = hits.any(axis=1)
+    metrics["mrr"] = float(np.mean(np.where(found, 1.0 / (first_hit + 1), 0.0)))
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = hits @ discounts
+    ideal = np.cumsum(discounts)[np.minimum(n_relevant, k).astype(int) - 1]
+    metrics[f"ndcg@{k}"] = float(np.mean(dcg / ideal))
+    return metrics
+
+def make_retriever(name, k):
+    """Function (question, embedding) -> ranked chunk_ids for one retriever"""
+    if name in ("faiss", "hybrid"):
+        from vectorstore.retriever import local_search
+        mode = "local" if name == "faiss" else "hybrid"
+        return lambda q, embedding: [r["chunk_id"] for r in
+                                     local_search(q, top_k=k, embedding=embedding, mode=mode)]
+    if name == "bm25":
+        from vectorstore.retriever import keyword_search
+        return lambda q, embedding: [r["chunk_id"] for r in keyword_search(q, top_k=k)]
+    if name == "azure":
+        from azure.search.documents.models import VectorizedQuery
+        from core.clients import get_search_client
+
+        def azure(q, embedding):
+            vector_query = VectorizedQuery(vector=embedding.tolist(), k_nearest_neighbors=k,
+                                           fields="embedding")
+            results = get_search_client().search(search_text=q, vector_queries=[vector_query],
+                                                 select=["id"], top=k)
+            return [r["id"] for r in results]
+        return azure
+    raise ValueError(f"Unknown retriever: {name}")
+
+def evaluate(name, queries, embeddings, k):
+    """Run every query through one retriever, timing each search"""
+    search = make_retriever(name, k)
+    search(queries[0]["question"], embeddings[0])  # load the store / open connections
+
+    retrieved, latencies = [], []
+    for query, embedding in zip(queries, embeddings):
+        start = time.perf_counter()
+        retrieved.append(search(query["question"], embedding))
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "retriever": name,
+        **score(retrieved, [q["relevant"] for q in queries], k),
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "latency_max_ms": float(latencies.max()),
+    }
+
+def evaluate_batch(queries, embeddings, k):
+    """The whole set as one FAISS multi-query search, for throughput"""
+    from vectorstore.retriever import local_search_batch
+    start = time.perf_counter()
+    local_search_batch([q["question"] for q in queries], top_k=k, embeddings=embeddings, mode="local")
+    return len(queries) / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline retrieval evaluation")
+    parser.add_argument("--seed", action="store_true", help="write the labeled set from the chunks and exit")
+    parser.add_argument("--chunks", default=CHUNKS_PATH)
+    parser.add_argument("--eval-set", default=EVAL_SET_PATH)
+    parser.add_argument("--retrievers", nargs="+", default=["faiss", "bm25", "hybrid"],
+                        help="faiss | bm25 | hybrid | azure")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_eval_set(args.chunks, args.eval_set)
+        sys.exit(0)
+
+    from embeddings.query_cache import embed_queries
+
+    queries = load_eval_set(args.eval_set)
+    start = time.perf_counter()
+    embeddings = embed_queries([q["question"] for q in queries])
+    embed_seconds = time.perf_counter() - start
+
+    results = [evaluate(name, queries, embeddings, args.k) for name in args.retrievers]
+    batch_qps = evaluate_batch(queries, embeddings, args.k) if "faiss" in args.retrievers else None
+
+    if args.json:
+        print(json.dumps({"queries": len(queries), "embed_seconds": embed_seconds,
+                          "faiss_batch_qps": batch_qps, "results": results}, indent=2))
+        sys.exit(0)
+
+    columns = [key for key in results[0] if key != "retriever"]
+    print(f"\n{len(queries)} queries, embedded in {embed_seconds:.2f}s")
+    print(f"{'retriever':<10}" + "".join(f"{c:>16}" for c in columns))
+    for result in results:
+        print(f"{result['retriever']:<10}" + "".join(f"{result[c]:>16.3f}" for c in columns))
+    if batch_qps:
+        print(f"\nFAISS batched search: {batch_qps:.0f} queries/s")
@@ -0,0 +1,90 @@
+# Cold start cost of a module, broken down by the packages it imports, using
+# the interpreter's own -X importtime timings in a fresh process:
+#   python benchmarks/startup_report.py
+#   python benchmarks/startup_report.py --module graph.agent_graph --top 25
+#   python benchmarks/startup_report.py --module api.main --lifespan
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Heavy dependencies worth calling out when they load on a path that may not need them
+WATCHED = ["openai", "langgraph", "langchain_core", "faiss", "pandas", "tiktoken",
+           "azure.search.documents", "aiohttp", "fastapi", "prometheus_client", "opentelemetry"]
+
+def measure(module, lifespan=False):
+    """Run the import (and optionally the app lifespan) in a subprocess.
+
+    Returns ([(depth, name, self_us, cumulative_us)], wall seconds, clients
+    built at import).
+    """
+    code = (
+        "import time; start = time.perf_counter()\n"
+        f"import {module}\n"
+        "wall = time.perf_counter() - start\n"
+        "from core import clients\n"
+        "built = len(clients._clients)\n"
+    )
+    if lifespan:
+        code += (
+            "import asyncio\n"
+            f"from {module} import app\n"
+            "async def run():\n"
+            "    async with app.router.lifespan_context(app):\n"
+            "        pass\n"
+            "start = time.perf_counter(); asyncio.run(run())\n"
+            "print('lifespan', time.perf_counter() - start)\n"
+        )
+    code += "print('wall', wall); print('clients', built)\n"
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=os.getcwd())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+
+    values = dict(line.split() for line in result.stdout.splitlines()
+                  if line.split() and line.split()[0] in ("wall", "clients", "lifespan"))
+    return imports, values
+
+def by_package(imports):
+    """Self time summed per top-level package, in ms"""
+    totals = defaultdict(float)
+    for _, name, self_us, _ in imports:
+        totals[name.split(".")[0]] += self_us / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time breakdown of a module")
+    parser.add_argument("--module", default="api.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--lifespan", action="store_true", help="also time the FastAPI lifespan startup")
+    args = parser.parse_args()
+
+    imports, values = measure(args.module, args.lifespan)
+    loaded = {name for _, name, _, _ in imports}
+
+    print(f"import {args.module}: {float(values['wall']) * 1000:.0f} ms wall, "
+          f"{len(imports)} modules, {values['clients']} shared clients built")
+    if "lifespan" in values:
+        print(f"lifespan startup: {float(values['lifespan']) * 1000:.0f} ms")
+
+    print(f"\n{'package':<28}{'self ms':>10}")
+    for package, ms in by_package(imports)[:args.top]:
+        print(f"{package:<28}{ms:>10.1f}")
+
+    print(f"\n{'heavy dependency':<28}{'cumulative ms':>14}")
+    for name in WATCHED:
+        cumulative = [c for _, n, _, c in imports if n == name]
+        status = f"{cumulative[0] / 1000:>14.1f}" if cumulative else f"{'not loaded':>14}"
+        print(f"{name:<28}{status}")
@@ -0,0 +1,95 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv('config/.env')
+
+# Connections each shared client keeps open to its service
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+# Clients are built on first use, once per process, so importing a module
+# never pays for SDK imports or client construction it does not need, and
+# every caller shares one connection pool per service
+_clients = {}
+_lock = threading.RLock()
+
+def _shared(name, build):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = build()
+    return client
+
+def openai_settings():
+    """Connection settings for Azure OpenAI, read from the environment"""
+    return {
+        "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
+        "azure_endpoint": os.getenv("AZURE_OPENAI_ENDPOINT"),
+        "api_version": os.getenv("AZURE_OPENAI_API_VERSION")
+    }
+
+def search_settings(index_name=None):
+    """Connection settings for Azure AI Search, read from the environment"""
+    from azure.core.credentials import AzureKeyCredential
+    if not os.getenv("AZURE_SEARCH_ENDPOINT") or not os.getenv("AZURE_SEARCH_KEY"):
+        raise ValueError("AZURE_SEARCH_ENDPOINT and AZURE_SEARCH_KEY must be set to use Azure AI Search")
+    return {
+        "endpoint": os.getenv("AZURE_SEARCH_ENDPOINT"),
+        "index_name": index_name or os.getenv("AZURE_SEARCH_INDEX"),
+        "credential": AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY"))
+    }
+
+def get_openai_client():
+    """Shared sync AzureOpenAI client (embeddings and chat)"""
+    def build():
+        import httpx
+        from openai import AzureOpenAI, DefaultHttpxClient
+        return AzureOpenAI(
+            **openai_settings(),
+            http_client=DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE
+            ))
+        )
+    return _shared("openai", build)
+
+def _requests_transport():
+    import requests
+    from azure.core.pipeline.transport import RequestsTransport
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return RequestsTransport(session=session, session_owner=False)
+
+def get_search_client(index_name=None):
+    """Shared sync SearchClient for an index (default AZURE_SEARCH_INDEX)"""
+    settings = search_settings(index_name)
+
+    def build():
+        from azure.search.documents import SearchClient
+        return SearchClient(**settings, transport=_shared("search_transport", _requests_transport))
+    return _shared(("search", settings["index_name"]), build)
+
+def get_search_index_client():
+    """Shared SearchIndexClient, for creating and updating indexes"""
+    def build():
+        from azure.search.documents.indexes import SearchIndexClient
+        settings = search_settings()
+        return SearchIndexClient(endpoint=settings["endpoint"], credential=settings["credential"],
+                                 transport=_shared("search_transport", _requests_transport))
+    return _shared("search_index", build)
+
+def create_async_openai_client(http_client):
+    """AsyncAzureOpenAI on the given httpx.AsyncClient; async clients belong to
+    an event loop, so the caller owns and closes them"""
+    from openai import AsyncAzureOpenAI
+    return AsyncAzureOpenAI(**openai_settings(), http_client=http_client)
+
+def create_async_search_client(session):
+    """Async SearchClient on the given aiohttp session, owned by the caller"""
+    from azure.core.pipeline.transport import AioHttpTransport
+    from azure.search.documents.aio import SearchClient as AsyncSearchClient
+    return AsyncSearchClient(**search_settings(),
+                             transport=AioHttpTransport(session=session, session_owner=False))
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import numpy as np
+from dotenv import load_dotenv
+from embeddings.engine import embed_texts
+
+load_dotenv('config/.env')
+
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embeddings/embedding_cache.npz")
+
+def cache_key(text, deployment):
+    """Content address of a chunk embedding: hash of deployment name and text"""
+    return hashlib.sha256(f"{deployment}\0{text}".encode('utf-8')).hexdigest()
+
+def load_cache(path=CACHE_PATH):
+    """Load cached embeddings as {key: vector}"""
+    if not os.path.exists(path):
+        return {}
+    with np.load(path, allow_pickle=False) as data:
+        return dict(zip(data['keys'].tolist(), data['vectors']))
+
+def save_cache(cache, path=CACHE_PATH):
+    """Write the cache atomically"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    keys = list(cache)
+    vectors = np.array([cache[k] for k in keys], dtype='float32')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, keys=np.array(keys), vectors=vectors)
+    os.replace(tmp_path, path)
+
+def embed_with_cache(texts, path=CACHE_PATH, prune=True):
+    """Embed texts, only calling the API for ones not already in the cache.
+
+    texts is taken to be the whole corpus, and entries for texts no longer
+    in it are dropped, unless prune=False (for embedding just a subset).
+    Returns a float32 array with one row per text.
+    """
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    cache = load_cache(path)
+    keys = [cache_key(text, deployment) for text in texts]
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in cache:
+            missing[key] = text
+    hits = sum(1 for key in keys if key in cache)
+
+    if missing:
+        vectors = embed_texts(list(missing.values()))
+        for key, vector in zip(missing, vectors):
+            cache[key] = np.array(vector, dtype='float32')
+
+    current = set(keys)
+    stale = [key for key in cache if key not in current] if prune else []
+    for key in stale:
+        del cache[key]
+
+    save_cache(cache, path)
+    print(f"Embedding cache: {hits} hits, {len(texts) - hits} misses, "
+          f"{len(stale)} stale entries removed")
+
+    return np.array([cache[key] for key in keys], dtype='float32')
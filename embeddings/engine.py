@@ -0,0 +1,80 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from openai import RateLimitError, InternalServerError
+from dotenv import load_dotenv
+from embeddings.tokens import count_tokens
+from core.clients import get_openai_client
+
+load_dotenv('config/.env')
+
+# Limits for one embeddings request
+MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "8000"))
+MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "256"))
+
+# Requests in flight at once, and retries on 429 / 5xx
+MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+RETRY_BASE_DELAY = float(os.getenv("EMBEDDING_RETRY_BASE_DELAY", "1.0"))
+
+def make_batches(texts):
+    """Group text positions into batches capped by token count and size"""
+    batches = []
+    batch, batch_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if batch and (batch_tokens + tokens > MAX_BATCH_TOKENS
+                      or len(batch) >= MAX_BATCH_SIZE):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _retry_delay(error, attempt):
+    """Delay before the next attempt, honouring Retry-After when present"""
+    retry_after = error.response.headers.get("retry-after") if error.response else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return RETRY_BASE_DELAY * (2 ** attempt)
+
+def embed_batch(texts):
+    """Embed a list of texts in a single request, retrying on 429 and 5xx"""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            # The client is shared with chat; only this loop retries embeddings
+            response = get_openai_client().with_options(max_retries=0).embeddings.create(
+                input=texts,
+                model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+            )
+            return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+        except (RateLimitError, InternalServerError) as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"Embedding request throttled ({e.status_code}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def embed_texts(texts):
+    """Embed many texts using batched requests run concurrently"""
+    if not texts:
+        return []
+
+    batches = make_batches(texts)
+    embeddings = [None] * len(texts)
+
+    def run(batch_number, batch):
+        vectors = embed_batch([texts[i] for i in batch])
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = vector
+        print(f"Embedded batch {batch_number}/{len(batches)} ({len(batch)} texts)")
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        futures = [executor.submit(run, n + 1, batch) for n, batch in enumerate(batches)]
+        for future in futures:
+            future.result()
+
+    return embeddings
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+from embeddings.engine import embed_batch, embed_texts
+
+load_dotenv('config/.env')
+
+# In-memory LRU bound, and optional sqlite file so the cache survives restarts
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH", "")
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+_db = None
+
+def normalize_query(query):
+    """Cache key for a query: lowercased with whitespace collapsed. Only the
+    key; the text embedded on a miss is the query as given"""
+    return " ".join(query.lower().split())
+
+def _get_db():
+    """Open the disk store on first use"""
+    global _db
+    if _db is None and QUERY_CACHE_PATH:
+        os.makedirs(os.path.dirname(QUERY_CACHE_PATH) or '.', exist_ok=True)
+        _db = sqlite3.connect(QUERY_CACHE_PATH, check_same_thread=False)
+        _db.execute("""CREATE TABLE IF NOT EXISTS query_embeddings (
+            deployment TEXT, query TEXT, vector BLOB,
+            PRIMARY KEY (deployment, query))""")
+        _db.commit()
+    return _db
+
+def _disk_get(deployment, key):
+    db = _get_db()
+    if db is None:
+        return None
+    with _lock:
+        row = db.execute(
+            "SELECT vector FROM query_embeddings WHERE deployment = ? AND query = ?",
+            (deployment, key)
+        ).fetchone()
+    return np.frombuffer(row[0], dtype='float32') if row else None
+
+def _disk_put(deployment, key, vector):
+    db = _get_db()
+    if db is None:
+        return
+    with _lock:
+        db.execute(
+            "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?)",
+            (deployment, key, vector.tobytes())
+        )
+        db.commit()
+
+def _remember(cache_key, vector):
+    with _lock:
+        _cache[cache_key] = vector
+        _cache.move_to_end(cache_key)
+        while len(_cache) > QUERY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _lookup(deployment, key):
+    """Cached vector for a normalized query, from memory or the disk store"""
+    cache_key = (deployment, key)
+    with _lock:
+        vector = _cache.get(cache_key)
+        if vector is not None:
+            _cache.move_to_end(cache_key)
+            _stats["hits"] += 1
+            return vector
+
+    vector = _disk_get(deployment, key)
+    if vector is not None:
+        with _lock:
+            _stats["hits"] += 1
+        _remember(cache_key, vector)
+    return vector
+
+def _store(deployment, key, embedding):
+    vector = np.array(embedding, dtype='float32')
+    with _lock:
+        _stats["misses"] += 1
+    _disk_put(deployment, key, vector)
+    _remember((deployment, key), vector)
+    return vector
+
+def embed_query(query):
+    """Embedding for a query text, served from the LRU cache when possible"""
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    key = normalize_query(query)
+
+    vector = _lookup(deployment, key)
+    if vector is None:
+        vector = _store(deployment, key, embed_batch([query])[0])
+    return vector.tolist()
+
+async def aembed_query(query, client):
+    """Async embed_query, calling the given AsyncAzureOpenAI client on a miss"""
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    key = normalize_query(query)
+
+    vector = _lookup(deployment, key)
+    if vector is None:
+        response = await client.embeddings.create(input=[query], model=deployment)
+        vector = _store(deployment, key, response.data[0].embedding)
+    return vector.tolist()
+
+def embed_queries(queries):
+    """Embeddings for many queries as a float32 array, one row per query.
+
+    Cached queries are served from the cache and the rest are embedded in
+    batched requests, each distinct key once, as its first spelling.
+    """
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    keys = [normalize_query(q) for q in queries]
+    texts = {}
+    for key, query in zip(keys, queries):
+        texts.setdefault(key, query)
+
+    vectors = {key: _lookup(deployment, key) for key in texts}
+    missing = [key for key, vector in vectors.items() if vector is None]
+    for key, embedding in zip(missing, embed_texts([texts[key] for key in missing])):
+        vectors[key] = _store(deployment, key, embedding)
+
+    if not keys:
+        return np.empty((0, 0), dtype='float32')
+    return np.stack([vectors[key] for key in keys])
+
+def cache_stats():
+    """Hit/miss counts and current size of the in-memory cache"""
+    with _lock:
+        return {**_stats, "size": len(_cache), "max_size": QUERY_CACHE_SIZE}
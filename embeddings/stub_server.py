@@ -0,0 +1,137 @@
+# Local stand-in for the Azure OpenAI embeddings endpoint.
+# Point AZURE_OPENAI_ENDPOINT at it to index without network access, or run
+# with --benchmark to measure embedding throughput:
+#   python embeddings/stub_server.py --port 8001
+#   python embeddings/stub_server.py --benchmark --texts 2000 --latency 0.2
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+sys.path.append('.')
+
+DIMENSION = 1536
+
+def fake_embedding(text, dimension=DIMENSION):
+    """Deterministic unit vector derived from the text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:4], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype('float32')
+    return vector / np.linalg.norm(vector)
+
+def make_handler(latency, per_input_latency, rate_limit_every):
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    class EmbeddingsHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            with lock:
+                counter["requests"] += 1
+                throttle = rate_limit_every and counter["requests"] % rate_limit_every == 0
+
+            if not self.path.split("?")[0].endswith("/embeddings"):
+                return self._send(404, {"error": {"message": "not found"}})
+            if throttle:
+                return self._send(429, {"error": {"code": "429", "message": "Rate limit"}},
+                                  {"Retry-After": "0.1"})
+
+            inputs = body.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            time.sleep(latency + per_input_latency * len(inputs))
+
+            data = []
+            for i, text in enumerate(inputs):
+                vector = fake_embedding(text)
+                if body.get("encoding_format") == "base64":
+                    embedding = base64.b64encode(vector.tobytes()).decode()
+                else:
+                    embedding = vector.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+            tokens = sum(len(t) // 4 + 1 for t in inputs)
+            self._send(200, {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "stub"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+            })
+
+        def _send(self, status, payload, headers=None):
+            raw = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, format, *args):
+            pass
+
+    return EmbeddingsHandler, counter
+
+def start_server(port=8001, latency=0.05, per_input_latency=0.0005, rate_limit_every=0):
+    """Start the stub in a background thread, returns (server, request counter)"""
+    handler, counter = make_handler(latency, per_input_latency, rate_limit_every)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+def run_benchmark(args):
+    server, counter = start_server(args.port, args.latency, args.per_input_latency,
+                                   args.rate_limit_every)
+    os.environ["AZURE_OPENAI_ENDPOINT"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault("AZURE_OPENAI_API_KEY", "stub")
+    os.environ.setdefault("AZURE_OPENAI_API_VERSION", "2024-02-01")
+    os.environ.setdefault("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "stub-embedding")
+
+    from embeddings import engine
+
+    texts = [f"Question: synthetic medicare question {i}?\nAnswer: " + "coverage details " * 20
+             for i in range(args.texts)]
+
+    sample = texts[:min(len(texts), 50)]
+    start = time.perf_counter()
+    for text in sample:
+        engine.embed_batch([text])
+    sequential_rate = len(sample) / (time.perf_counter() - start)
+
+    counter["requests"] = 0
+    start = time.perf_counter()
+    engine.embed_texts(texts)
+    elapsed = time.perf_counter() - start
+
+    print(f"\nOne request per text: {sequential_rate:.1f} texts/s")
+    print(f"Batched engine:       {len(texts) / elapsed:.1f} texts/s "
+          f"({counter['requests']} requests, {elapsed:.2f}s)")
+    server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Azure OpenAI embeddings server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--per-input-latency", type=float, default=0.0005, help="seconds per input text")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="return 429 on every Nth request")
+    parser.add_argument("--benchmark", action="store_true", help="measure engine throughput against the stub")
+    parser.add_argument("--texts", type=int, default=1000, help="texts to embed in --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args)
+    else:
+        server, _ = start_server(args.port, args.latency, args.per_input_latency, args.rate_limit_every)
+        print(f"Stub embeddings server on http://127.0.0.1:{args.port}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
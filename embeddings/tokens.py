@@ -0,0 +1,33 @@
+import tiktoken
+
+# Tokenizer of the OpenAI embedding and chat models
+ENCODING_NAME = "cl100k_base"
+
+_encoding = None
+
+def get_encoding():
+    """tiktoken encoding, or None if it cannot be loaded (no cache, no network)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception as e:
+            print(f"tiktoken unavailable, estimating token counts: {e}")
+            _encoding = False
+    return _encoding or None
+
+def count_tokens(text):
+    """Number of tokens in text"""
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def split_tokens(text, max_tokens):
+    """Cut text into pieces of at most max_tokens tokens, ignoring boundaries"""
+    encoding = get_encoding()
+    if encoding is None:
+        size = max_tokens * 4
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
@@ -1,15 +1,25 @@
 import sys
 sys.path.append('.')
 
+import os
+import threading
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, List
+from typing import TypedDict, List, Optional
 from agents.retrieval_agent import retrieval_agent
 from agents.validation_agent import validation_agent
 from agents.response_agent import response_agent
+from monitoring.metrics import stage, traced
+
+# Queries run at once by run_agents_batch
+BATCH_CONCURRENCY = int(os.getenv("AGENT_BATCH_CONCURRENCY", "8"))
+
+_compiled_graph = None
+_graph_lock = threading.Lock()
 
 # Define state
 class AgentState(TypedDict):
     query: str
+    filters: Optional[dict]
     retrieved_chunks: List[dict]
     retrieval_done: bool
     validation_passed: bool
@@ -28,10 +38,10 @@ def build_graph():
     """Build multi agent graph"""
     graph = StateGraph(AgentState)
     
-    # Add nodes
-    graph.add_node("retrieval_agent", retrieval_agent)
-    graph.add_node("validation_agent", validation_agent)
-    graph.add_node("response_agent", response_agent)
+    # Add nodes, each timed and traced as a stage
+    graph.add_node("retrieval_agent", traced("retrieval_agent")(retrieval_agent))
+    graph.add_node("validation_agent", traced("validation_agent")(validation_agent))
+    graph.add_node("response_agent", traced("response_agent")(response_agent))
     
     # Add edges
     graph.set_entry_point("retrieval_agent")
@@ -48,28 +58,51 @@ def build_graph():
     
     return graph.compile()
 
-def run_agent(query):
-    """Run the multi agent pipeline"""
-    print(f"\n{'='*50}")
-    print(f"Query: {query}")
-    print(f"{'='*50}")
-    
-    graph = build_graph()
-    
-    result = graph.invoke({
+def get_graph():
+    """Compiled graph, built once per process and shared by all callers"""
+    global _compiled_graph
+    if _compiled_graph is None:
+        with _graph_lock:
+            if _compiled_graph is None:
+                _compiled_graph = build_graph()
+    return _compiled_graph
+
+def initial_state(query, filters=None):
+    return {
         "query": query,
+        "filters": filters,
         "retrieved_chunks": [],
         "retrieval_done": False,
         "validation_passed": False,
         "validation_message": "",
         "final_answer": "",
         "sources": []
-    })
+    }
+
+def run_agent(query, filters=None):
+    """Run the multi agent pipeline, retrieving only chunks matching filters"""
+    print(f"\n{'='*50}")
+    print(f"Query: {query}")
+    print(f"{'='*50}")
+    
+    with stage("agent_graph"):
+        result = get_graph().invoke(initial_state(query, filters))
     
     print(f"\n📋 Final Answer: {result['final_answer']}")
     print(f"📚 Sources: {result['sources']}")
     return result
 
+def run_agents_batch(queries, filters=None, max_concurrency=BATCH_CONCURRENCY):
+    """Run many queries through the graph at once, retrieving only chunks
+    matching filters; results in input order, with the exception in place
+    of the state for a query that failed"""
+    with stage("agent_graph_batch"):
+        return get_graph().batch(
+            [initial_state(q, filters) for q in queries],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+
 if __name__ == "__main__":
     run_agent("Who is eligible for Medicare?")
     run_agent("What does Medicare Part A cover?")
@@ -0,0 +1,123 @@
+import functools
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from dotenv import load_dotenv
+from prometheus_client import Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+load_dotenv('config/.env')
+
+# OpenTelemetry is optional: spans are only recorded when the API package is
+# installed, and only exported when an SDK/exporter is configured
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer("healthcare-rag")
+except ImportError:
+    trace = None
+    _tracer = None
+
+# Ask for token usage on streamed completions too (Azure API 2024-09-01+)
+STREAM_USAGE = os.getenv("METRICS_STREAM_USAGE", "true").lower() == "true"
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds", "Time spent in one stage of answering a query",
+    ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    "rag_stage_errors_total", "Stages that raised or timed out", ["stage"]
+)
+REQUEST_SECONDS = Histogram(
+    "rag_request_duration_seconds", "End to end request time", ["endpoint"],
+    buckets=STAGE_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total", "Tokens reported in response.usage", ["kind"]
+)
+CONTEXT_TOKENS = Counter(
+    "rag_context_tokens_total",
+    "Retrieved chunk tokens put into prompts (used) or dropped as duplicate/over budget (saved)",
+    ["kind"]
+)
+
+def content():
+    """(body, content type) for the /metrics endpoint"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+@contextmanager
+def stage(name, **attributes):
+    """Time a block into the stage histogram, inside an OpenTelemetry span"""
+    span_context = (_tracer.start_as_current_span(f"rag.{name}", attributes=attributes)
+                    if _tracer else nullcontext())
+    start = time.perf_counter()
+    with span_context as span:
+        try:
+            yield span
+        except Exception:
+            # Cancellation (e.g. a search abandoned on a cache hit) is not an error
+            STAGE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            STAGE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+def traced(name):
+    """Decorator running a function (e.g. a LangGraph node) as a stage"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def observe(name, seconds):
+    """Record a duration measured by hand, e.g. time to first token"""
+    STAGE_SECONDS.labels(name).observe(seconds)
+
+def record_usage(usage):
+    """Count prompt/completion tokens from a completion's usage block"""
+    if usage is None:
+        return
+    LLM_TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+    if trace is not None:
+        span = trace.get_current_span()
+        span.set_attribute("llm.prompt_tokens", usage.prompt_tokens or 0)
+        span.set_attribute("llm.completion_tokens", usage.completion_tokens or 0)
+
+def record_context(stats):
+    """Count context tokens used and saved, from build_context's stats"""
+    CONTEXT_TOKENS.labels("used").inc(stats["tokens_used"])
+    CONTEXT_TOKENS.labels("saved").inc(stats["tokens_saved"])
+    if trace is not None:
+        span = trace.get_current_span()
+        span.set_attribute("context.tokens_used", stats["tokens_used"])
+        span.set_attribute("context.tokens_saved", stats["tokens_saved"])
+
+class CacheCollector:
+    """Exports hits/misses/size of caches that keep a cache_stats() dict"""
+
+    def __init__(self):
+        self.caches = {}
+
+    def collect(self):
+        requests = CounterMetricFamily("rag_cache_requests", "Cache lookups",
+                                       labels=["cache", "result"])
+        size = GaugeMetricFamily("rag_cache_entries", "Entries held in a cache",
+                                 labels=["cache"])
+        for name, stats_fn in self.caches.items():
+            stats = stats_fn()
+            requests.add_metric([name, "hit"], stats["hits"])
+            requests.add_metric([name, "miss"], stats["misses"])
+            size.add_metric([name], stats["size"])
+        yield requests
+        yield size
+
+_caches = CacheCollector()
+REGISTRY.register(_caches)
+
+def register_cache(name, stats_fn):
+    """Export a cache's hit rate; stats_fn returns {"hits", "misses", "size"}"""
+    _caches.caches[name] = stats_fn
@@ -1,7 +1,5 @@
-import json
+import argparse
 import os
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import (
     SearchIndex,
     SimpleField,
@@ -12,35 +10,36 @@ from azure.search.documents.indexes.models import (
     VectorSearchProfile,
     SearchField
 )
-from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
 from dotenv import load_dotenv
+import sys
+sys.path.append('.')
+from embeddings.engine import embed_batch
+from vectorstore.index_version import bump_index_version
+from pipelines.search_indexer import sync_index
+from core.clients import get_search_client, get_search_index_client
 
 load_dotenv('config/.env')
 
-# Clients
-search_endpoint = os.getenv("AZURE_SEARCH_ENDPOINT")
-search_key = os.getenv("AZURE_SEARCH_KEY")
 index_name = os.getenv("AZURE_SEARCH_INDEX")
 
-index_client = SearchIndexClient(
-    endpoint=search_endpoint,
-    credential=AzureKeyCredential(search_key)
-)
+# JSON array from run_chunking, or JSONL from the streaming chunker
+CHUNKS_PATH = os.getenv("CHUNKS_PATH", "data/processed/cms_faq_chunks.json")
 
-openai_client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
+def create_search_index(recreate=False):
+    """Create Azure AI Search index with vector support.
 
-def create_search_index():
-    """Create Azure AI Search index with vector support"""
+    Attributes of existing fields cannot be changed in place (e.g. an index
+    created before category was facetable); recreate=True drops the index
+    first. Without it such an index raises RuntimeError saying so.
+    """
     fields = [
         SimpleField(name="id", type=SearchFieldDataType.String, key=True),
         SearchableField(name="content", type=SearchFieldDataType.String),
-        SimpleField(name="category", type=SearchFieldDataType.String, filterable=True),
+        # Filterable for category- and date-scoped search, facetable for /categories
+        SimpleField(name="category", type=SearchFieldDataType.String, filterable=True, facetable=True),
         SimpleField(name="source", type=SearchFieldDataType.String),
+        SimpleField(name="last_updated", type=SearchFieldDataType.DateTimeOffset, filterable=True),
         SearchField(
             name="embedding",
             type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
@@ -64,53 +63,53 @@ def create_search_index():
         vector_search=vector_search
     )
 
-    index_client.create_or_update_index(index)
+    if recreate:
+        try:
+            get_search_index_client().delete_index(index_name)
+        except ResourceNotFoundError:
+            pass
+    try:
+        get_search_index_client().create_or_update_index(index)
+    except HttpResponseError as e:
+        if recreate or e.status_code != 400:
+            raise
+        raise RuntimeError(f"Index '{index_name}' has a different schema that cannot be updated "
+                           f"in place ({e.message}). Run again with --recreate to drop and "
+                           f"rebuild it.") from None
     print(f"Index '{index_name}' created!")
 
 def generate_embedding(text):
     """Generate embedding using Azure OpenAI"""
-    response = openai_client.embeddings.create(
-        input=text,
-        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    )
-    return response.data[0].embedding
-
-def upload_documents():
-    """Upload documents with embeddings to Azure AI Search"""
-    with open('data/processed/cms_faq_chunks.json', 'r') as f:
-        chunks = json.load(f)
+    return embed_batch([text])[0]
 
-    search_client = SearchClient(
-        endpoint=search_endpoint,
-        index_name=index_name,
-        credential=AzureKeyCredential(search_key)
-    )
-
-    documents = []
-    for chunk in chunks:
-        print(f"Processing {chunk['chunk_id']}...")
-        embedding = generate_embedding(chunk['text'])
-        documents.append({
-            "id": chunk['chunk_id'],
-            "content": chunk['text'],
-            "category": chunk['category'],
-            "source": chunk['source'],
-            "embedding": embedding
-        })
+def upload_documents(full=False):
+    """Upload new and changed chunks with embeddings to Azure AI Search and
+    delete removed ones; full=True re-sends everything"""
+    stats = sync_index(get_search_client(index_name), index_name, CHUNKS_PATH, full=full)
+    if stats["uploaded"] or stats["deleted"]:
+        bump_index_version()
+    return stats
 
-    search_client.upload_documents(documents)
-    print(f"Uploaded {len(documents)} documents!")
-
-def run_azure_search_pipeline():
+def run_azure_search_pipeline(full=False, recreate=False):
     print("Starting Azure AI Search Pipeline...")
     
     # Step 1 - Create index
-    create_search_index()
+    create_search_index(recreate)
     
-    # Step 2 - Upload documents
-    upload_documents()
+    # Step 2 - Upload documents, all of them into a recreated index
+    upload_documents(full or recreate)
     
     print("\nAzure AI Search Pipeline Complete!")
 
 if __name__ == "__main__":
-    run_azure_search_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create and fill the Azure AI Search index")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-upload every chunk")
+    parser.add_argument("--recreate", action="store_true",
+                        help="drop and recreate the index, for schema changes to existing fields")
+    args = parser.parse_args()
+
+    try:
+        run_azure_search_pipeline(args.full, args.recreate)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
\ No newline at end of file
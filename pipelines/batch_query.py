@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+sys.path.append('.')
+from embeddings.query_cache import embed_queries
+from vectorstore.retriever import RETRIEVER, local_search_batch
+from agents.validation_agent import relevant_chunks
+from pipelines.rag_pipeline import generate_answer
+from pipelines.questions import read_questions
+from vectorstore.filters import make_filters
+
+load_dotenv('config/.env')
+
+# Completions in flight at once, and questions embedded and searched together
+BATCH_CONCURRENCY = int(os.getenv("BATCH_QUERY_CONCURRENCY", "8"))
+BATCH_WINDOW = int(os.getenv("BATCH_QUERY_WINDOW", "256"))
+
+# "rag" answers from batched local retrieval; "graph" runs each window
+# through the multi agent graph, like the API's QUERY_ENGINE
+QUERY_ENGINE = os.getenv("QUERY_ENGINE", "rag")
+
+NO_ANSWER = "I don't have information about that."
+
+def windows(items, size):
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) == size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+def parsed(questions, rejected):
+    """The questions that parsed; error results for the rest go to rejected"""
+    for position, record_id, question in questions:
+        if isinstance(question, Exception):
+            rejected.append({"index": position, "id": record_id, "query": None,
+                             "sources": [], "answer": None, "error": str(question)})
+        else:
+            yield position, record_id, question
+
+def answer(position, record_id, question, chunks):
+    """Result record for one question; errors are reported, not raised"""
+    result = {"index": position, "id": record_id, "query": question,
+              "sources": sorted(set(c['category'] for c in chunks))}
+    try:
+        result["answer"] = generate_answer(question, chunks) if chunks else NO_ANSWER
+    except Exception as e:
+        result["answer"] = None
+        result["error"] = str(e)
+    return result
+
+def graph_answers(questions, filters=None, concurrency=BATCH_CONCURRENCY, window=BATCH_WINDOW):
+    """answer_batch through the multi agent graph, one window at a time"""
+    from graph.agent_graph import run_agents_batch
+    for batch in windows(questions, window):
+        states = run_agents_batch([question for _, _, question in batch], filters, concurrency)
+        for (position, record_id, question), state in zip(batch, states):
+            result = {"index": position, "id": record_id, "query": question}
+            if isinstance(state, Exception):
+                result.update(sources=[], answer=None, error=str(state))
+            else:
+                result.update(sources=sorted(set(state["sources"])),
+                              answer=state["final_answer"] or NO_ANSWER)
+            yield result
+
+def answer_batch(questions, concurrency=BATCH_CONCURRENCY, window=BATCH_WINDOW, filters=None):
+    """Answer (position, id, question) tuples, yielding results as they complete.
+
+    Each window of questions is embedded in batched requests and searched
+    with one FAISS call; its completions then run on a shared pool while
+    the next window is embedded. Results come out in completion order and
+    carry their input position. Only chunks matching filters are used.
+    Lines that are not questions get an error result.
+    """
+    rejected = []
+    questions = parsed(questions, rejected)
+    if QUERY_ENGINE == "graph":
+        for result in graph_answers(questions, filters, concurrency, window):
+            yield from rejected
+            rejected.clear()
+            yield result
+        yield from rejected
+        return
+
+    # Batch retrieval always runs against the local FAISS store
+    mode = "hybrid" if RETRIEVER == "hybrid" else "local"
+    pending = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for batch in windows(questions, window):
+            texts = [question for _, _, question in batch]
+            results = local_search_batch(texts, top_k=3, embeddings=embed_queries(texts), mode=mode,
+                                         filters=filters)
+            for (position, record_id, question), chunks in zip(batch, results):
+                pending.add(executor.submit(answer, position, record_id, question,
+                                            relevant_chunks(chunks)))
+
+            yield from rejected
+            rejected.clear()
+
+            # Keep the pool fed, but do not let finished results pile up
+            while len(pending) > concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        yield from rejected
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def run_batch(input_path, output_path=None, concurrency=BATCH_CONCURRENCY, filters=None):
+    """Answer every question in a JSONL file, writing JSONL results as they complete"""
+    output_path = output_path or os.path.splitext(input_path)[0] + '.answers.jsonl'
+    answered = failed = 0
+    with open(input_path) as f, open(output_path, 'w') as output:
+        for result in answer_batch(read_questions(f), concurrency, filters=filters):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            answered += 1
+            failed += "error" in result
+    print(f"\nAnswered {answered} questions ({failed} failed), results in {output_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions")
+    parser.add_argument("input", help="JSONL file, one question per line")
+    parser.add_argument("--output", help="JSONL results file (default: <input>.answers.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--category", help="only answer from chunks in this category")
+    parser.add_argument("--updated-after", help="only answer from chunks updated on or after this date")
+    args = parser.parse_args()
+
+    run_batch(args.input, args.output, args.concurrency,
+              make_filters(args.category, args.updated_after))
@@ -1,5 +1,32 @@
+import argparse
 import json
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append('.')
+from pipelines.streaming import run_streaming_stage
+from embeddings.tokens import count_tokens, split_tokens
+
+# Chunk size limit (including the question prefix) and overlap, in tokens
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# Answer tokens per chunk even when the question itself is very long
+MIN_ANSWER_TOKENS = 64
+
+# Worker processes for large corpora; smaller inputs are chunked in-process
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_RECORDS = 1000
+
+# Boundaries to split on, coarsest first. Zero-width patterns keep the
+# separators in the pieces, so joining pieces restores the original text.
+SPLIT_PATTERNS = [
+    re.compile(r'(?<=\n\n)'),        # paragraphs
+    re.compile(r'(?<=\n)'),           # lines
+    re.compile(r'(?<=[.!?])(?=\s)'),  # sentences
+    re.compile(r'(?<=\s)')            # words
+]
 
 def load_processed_data(filepath):
     """Load processed data"""
@@ -8,24 +35,90 @@ def load_processed_data(filepath):
     print(f"Loaded {len(data)} processed records")
     return data
 
-def chunk_documents(data):
-    """Convert each FAQ into a chunk ready for embedding"""
+def split_text(text, max_tokens, patterns=SPLIT_PATTERNS):
+    """Recursively split text on the coarsest boundary that fits max_tokens.
+
+    Returns (piece, token count) pairs.
+    """
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return [(text, tokens)]
+    if not patterns:
+        return [(piece, count_tokens(piece)) for piece in split_tokens(text, max_tokens)]
+
+    parts = [p for p in patterns[0].split(text) if p]
+    if len(parts) == 1:
+        return split_text(text, max_tokens, patterns[1:])
+
+    pieces = []
+    for part in parts:
+        pieces.extend(split_text(part, max_tokens, patterns[1:]))
+    return pieces
+
+def merge_pieces(pieces, max_tokens, overlap_tokens):
+    """Pack pieces into chunks of up to max_tokens, repeating up to
+    overlap_tokens of trailing pieces at the start of the next chunk"""
     chunks = []
-    
-    for record in data:
-        chunk = {
-            "chunk_id": f"{record['id']}_chunk_1",
-            "source_id": record['id'],
+    current, current_tokens = [], 0
+
+    for piece, tokens in pieces:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(p for p, _ in current).strip())
+
+            carried, carried_tokens = [], 0
+            for prev, prev_tokens in reversed(current):
+                if (carried_tokens + prev_tokens > overlap_tokens
+                        or carried_tokens + prev_tokens + tokens > max_tokens):
+                    break
+                carried.insert(0, (prev, prev_tokens))
+                carried_tokens += prev_tokens
+            current, current_tokens = carried, carried_tokens
+
+        current.append((piece, tokens))
+        current_tokens += tokens
+
+    if current:
+        chunks.append("".join(p for p, _ in current).strip())
+    return [c for c in chunks if c]
+
+def chunk_record(record, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Chunks for a single FAQ record.
+
+    Answers that fit in max_tokens stay one chunk; longer ones are split on
+    paragraph, sentence and word boundaries, each chunk repeating the question.
+    """
+    prefix = f"Question: {record['question']}\nAnswer: "
+    if count_tokens(prefix + record['answer']) <= max_tokens:
+        parts = [record['answer']]
+    else:
+        budget = max(max_tokens - count_tokens(prefix), MIN_ANSWER_TOKENS)
+        parts = merge_pieces(split_text(record['answer'], budget), budget,
+                             min(overlap_tokens, budget // 2))
+
+    return [{
+        "chunk_id": f"{record['id']}_chunk_{n}",
+        "source_id": record['id'],
+        "category": record['category'],
+        "source": record['source'],
+        "text": prefix + part,
+        "metadata": {
             "category": record['category'],
             "source": record['source'],
-            "text": f"Question: {record['question']}\nAnswer: {record['answer']}",
-            "metadata": {
-                "category": record['category'],
-                "source": record['source'],
-                "last_updated": record['last_updated']
-            }
+            "last_updated": record['last_updated']
         }
-        chunks.append(chunk)
+    } for n, part in enumerate(parts, start=1)]
+
+def chunk_documents(data, workers=CHUNK_WORKERS):
+    """Convert each FAQ into chunks ready for embedding"""
+    chunks = []
+    
+    if workers > 1 and len(data) >= PARALLEL_MIN_RECORDS:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for record_chunks in executor.map(chunk_record, data, chunksize=256):
+                chunks.extend(record_chunks)
+    else:
+        for record in data:
+            chunks.extend(chunk_record(record))
     
     print(f"Created {len(chunks)} chunks")
     return chunks
@@ -55,5 +148,20 @@ def run_chunking():
         print(f"Category: {chunk['category']}")
         print(f"Text Preview: {chunk['text'][:100]}...")
 
+def run_streaming_chunking(input_path, output_path):
+    """Chunk a JSON or JSONL file record by record into JSONL, resumably"""
+    print("Starting Streaming Chunking Pipeline...")
+    run_streaming_stage(input_path, output_path, chunk_record, workers=CHUNK_WORKERS)
+    print("\nChunking Complete!")
+
 if __name__ == "__main__":
-    run_chunking()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Chunk processed CMS FAQ data")
+    parser.add_argument("--stream", action="store_true", help="constant-memory JSONL mode")
+    parser.add_argument("--input", default="data/processed/cms_faq_processed.jsonl")
+    parser.add_argument("--output", default="data/processed/cms_faq_chunks.jsonl")
+    args = parser.parse_args()
+
+    if args.stream:
+        run_streaming_chunking(args.input, args.output)
+    else:
+        run_chunking()
\ No newline at end of file
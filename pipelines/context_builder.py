@@ -0,0 +1,92 @@
+import hashlib
+import os
+import sys
+from dotenv import load_dotenv
+sys.path.append('.')
+from embeddings.tokens import count_tokens, split_tokens
+from monitoring.metrics import record_context
+
+load_dotenv('config/.env')
+
+# Token budget for retrieved context in a prompt
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+
+# Word-shingle Jaccard similarity above which two chunks count as duplicates
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+SHINGLE_SIZE = 3
+
+SEPARATOR = "\n\n"
+
+def chunk_text(chunk):
+    """Text of a chunk from Azure Search ("content") or the local store ("text")"""
+    return chunk.get("content") or chunk.get("text") or ""
+
+def chunk_score(chunk):
+    """Retrieval score of a chunk, higher is better, None if unknown"""
+    for key in ("score", "similarity_score"):
+        if chunk.get(key) is not None:
+            return chunk[key]
+    return None
+
+def _shingles(text):
+    words = text.lower().split()
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def _is_near_duplicate(shingles, kept_shingles):
+    for other in kept_shingles:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+def build_context(chunks, max_tokens=CONTEXT_MAX_TOKENS):
+    """Join retrieved chunks into prompt context under a token budget.
+
+    Chunks are ordered by score, exact and near duplicates are dropped, and
+    chunks that would overflow the budget are skipped. Returns
+    (context, chunks used, stats).
+    """
+    # Stable sort, so chunks without scores keep their retrieval order
+    ordered = sorted(chunks, key=lambda c: -(chunk_score(c) or 0.0))
+
+    seen_hashes = set()
+    kept_shingles = []
+    parts, used = [], []
+    used_tokens = 0
+    separator_tokens = count_tokens(SEPARATOR)
+    tokens_in = sum(count_tokens(chunk_text(c)) for c in chunks)
+
+    for chunk in ordered:
+        text = chunk_text(chunk).strip()
+        digest = hashlib.sha1(" ".join(text.lower().split()).encode('utf-8')).hexdigest()
+        if not text or digest in seen_hashes:
+            continue
+        shingles = _shingles(text)
+        if _is_near_duplicate(shingles, kept_shingles):
+            continue
+
+        tokens = count_tokens(text) + (separator_tokens if parts else 0)
+        if used_tokens + tokens > max_tokens:
+            if parts:
+                continue
+            # The best chunk alone is over budget - keep its beginning
+            text = split_tokens(text, max_tokens)[0]
+            tokens = count_tokens(text)
+
+        seen_hashes.add(digest)
+        kept_shingles.append(shingles)
+        parts.append(text)
+        used.append(chunk)
+        used_tokens += tokens
+
+    stats = {
+        "chunks_in": len(chunks),
+        "chunks_used": len(used),
+        "tokens_in": tokens_in,
+        "tokens_used": used_tokens,
+        "tokens_saved": max(tokens_in - used_tokens, 0)
+    }
+    record_context(stats)
+    return SEPARATOR.join(parts), used, stats
@@ -1,7 +1,11 @@
+import argparse
 import json
 import pandas as pd
 from datetime import datetime
 import os
+import sys
+sys.path.append('.')
+from pipelines.streaming import run_streaming_stage
 
 def load_raw_data(filepath):
     """Load raw CMS FAQ data"""
@@ -27,6 +31,17 @@ def clean_data(data):
     print(f"Cleaned {len(df)} records")
     return df
 
+def clean_record(record, processed_at):
+    """Clean and normalize a single record, matching clean_data"""
+    record = dict(record)
+    record['question'] = record['question'].strip().lower()
+    record['answer'] = record['answer'].strip()
+    record['category'] = record['category'].strip()
+    record['processed_at'] = processed_at
+    record['text'] = "Question: " + record['question'] + "\nAnswer: " + record['answer']
+    record['word_count'] = len(record['text'].split())
+    return record
+
 def save_processed_data(df, output_path):
     """Save processed data"""
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -48,5 +63,22 @@ def run_pipeline():
     print("\nPipeline Complete!")
     print(df[['id', 'category', 'word_count']].to_string())
 
+def run_streaming_pipeline(input_path, output_path):
+    """Clean a JSON or JSONL dump record by record into JSONL, resumably"""
+    print("Starting Streaming Data Pipeline...")
+    processed_at = datetime.now().isoformat()
+    run_streaming_stage(input_path, output_path,
+                        lambda record: [clean_record(record, processed_at)])
+    print("\nPipeline Complete!")
+
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean raw CMS FAQ data")
+    parser.add_argument("--stream", action="store_true", help="constant-memory JSONL mode")
+    parser.add_argument("--input", default="data/raw/cms_faq_data.json")
+    parser.add_argument("--output", default="data/processed/cms_faq_processed.jsonl")
+    args = parser.parse_args()
+
+    if args.stream:
+        run_streaming_pipeline(args.input, args.output)
+    else:
+        run_pipeline()
\ No newline at end of file
@@ -1,86 +1,120 @@
-import json
+import argparse
 import os
+import sys
 import faiss
-import numpy as np
-from openai import AzureOpenAI
 from dotenv import load_dotenv
+sys.path.append('.')
+from embeddings.engine import embed_batch
+from embeddings.cache import embed_with_cache
+from vectorstore.index_version import bump_index_version
+from vectorstore.faiss_index import FAISS_INDEX_TYPE, create_index, index_type_name
+from vectorstore.chunk_store import write_chunk_store
+from vectorstore.mutable_store import MutableVectorStore, chunk_hash
+from pipelines.streaming import iter_json_records
 
 # Load environment variables
 load_dotenv('config/.env')
 
-# Azure OpenAI client
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
+# JSON array from run_chunking, or JSONL from the streaming chunker
+CHUNKS_PATH = os.getenv("CHUNKS_PATH", "data/processed/cms_faq_chunks.json")
 
 def load_chunks(filepath):
-    """Load chunks from file"""
-    with open(filepath, 'r') as f:
-        chunks = json.load(f)
+    """Load chunks from a JSON or JSONL file"""
+    chunks = [chunk for chunk, _ in iter_json_records(filepath)]
     print(f"Loaded {len(chunks)} chunks")
     return chunks
 
 def generate_embedding(text):
     """Generate embedding using Azure OpenAI"""
-    response = client.embeddings.create(
-        input=text,
-        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    )
-    return response.data[0].embedding
+    return embed_batch([text])[0]
 
 def build_vector_store(chunks):
     """Build FAISS vector store from chunks"""
     print("Generating embeddings...")
     
-    embeddings = []
+    embeddings_array = embed_with_cache([chunk['text'] for chunk in chunks])
     for i, chunk in enumerate(chunks):
-        print(f"Embedding chunk {i+1}/{len(chunks)}: {chunk['chunk_id']}")
-        embedding = generate_embedding(chunk['text'])
-        embeddings.append(embedding)
         chunk['embedding_index'] = i
     
-    # Convert to numpy array
-    embeddings_array = np.array(embeddings).astype('float32')
+    # Build FAISS index, ID-mapped so it can be updated in place later
+    index = create_index(embeddings_array, FAISS_INDEX_TYPE, ids=range(len(chunks)))
     
-    # Build FAISS index
-    dimension = len(embeddings[0])
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings_array)
-    
-    print(f"Vector store built with {index.ntotal} vectors!")
+    print(f"Vector store built with {index.ntotal} vectors ({index_type_name(index)})!")
     return index, chunks
 
 def save_vector_store(index, chunks):
     """Save FAISS index and chunks"""
     os.makedirs('data/embeddings', exist_ok=True)
     
-    # Save FAISS index
-    faiss.write_index(index, 'data/embeddings/faiss_index.bin')
+    # Write to temp files and swap them in, so running API processes
+    # never hot reload a half-written store
+    faiss.write_index(index, 'data/embeddings/faiss_index.bin.tmp')
+    
+    # Save chunks with metadata, as offset-indexed JSON lines that
+    # workers can memory-map
+    chunks_to_save = [{k: v for k, v in chunk.items() 
+                      if k != 'embedding'} for chunk in chunks]
+    write_chunk_store(chunks_to_save, 'data/embeddings/chunks_metadata.jsonl',
+                      'data/embeddings/chunks_metadata.offsets.npy')
     
-    # Save chunks with metadata
-    with open('data/embeddings/chunks_metadata.json', 'w') as f:
-        chunks_to_save = [{k: v for k, v in chunk.items() 
-                          if k != 'embedding'} for chunk in chunks]
-        json.dump(chunks_to_save, f, indent=2)
+    os.replace('data/embeddings/chunks_metadata.offsets.npy.tmp', 'data/embeddings/chunks_metadata.offsets.npy')
+    os.replace('data/embeddings/chunks_metadata.jsonl.tmp', 'data/embeddings/chunks_metadata.jsonl')
+    os.replace('data/embeddings/faiss_index.bin.tmp', 'data/embeddings/faiss_index.bin')
+    # Logged updates are part of the new store; emptied last, as readers
+    # skip entries that no longer match the metadata
+    if os.path.exists('data/embeddings/faiss_index.log.jsonl'):
+        with open('data/embeddings/faiss_index.log.jsonl.tmp', 'w'):
+            pass
+        os.replace('data/embeddings/faiss_index.log.jsonl.tmp', 'data/embeddings/faiss_index.log.jsonl')
+    bump_index_version()
     
     print("Vector store saved!")
 
-def run_embedding_pipeline():
+def update_vector_store(store, chunks):
+    """Apply the difference between chunks and the store in place"""
+    stored = store.chunk_hashes()
+    changed = [c for c in chunks if stored.get(c['chunk_id']) != chunk_hash(c)]
+    removed = set(stored) - {c['chunk_id'] for c in chunks}
+    print(f"{len(changed)} new or changed, {len(removed)} removed, "
+          f"{len(chunks) - len(changed)} unchanged")
+
+    store.upsert(changed)
+    store.delete(removed)
+    store.commit()
+    return store
+
+def run_embedding_pipeline(full=False):
     print("Starting Embedding Pipeline...")
     
     # Step 1 - Load chunks
-    chunks = load_chunks('data/processed/cms_faq_chunks.json')
+    chunks = load_chunks(CHUNKS_PATH)
     
-    # Step 2 - Build vector store
+    # Step 2 - Update the existing store in place, unless asked for or
+    # it cannot be (none yet, built before ID mapping, or HNSW)
+    store = None
+    if not full:
+        try:
+            store = MutableVectorStore()
+        except (FileNotFoundError, ValueError) as e:
+            print(f"{e} - rebuilding the whole store")
+    if store is not None:
+        update_vector_store(store, chunks)
+        print("\nEmbedding Pipeline Complete!")
+        print(f"Total vectors stored: {len(store)}")
+        return
+
+    # Step 3 - Build vector store
     index, chunks = build_vector_store(chunks)
     
-    # Step 3 - Save
+    # Step 4 - Save
     save_vector_store(index, chunks)
     
     print("\nEmbedding Pipeline Complete!")
     print(f"Total vectors stored: {index.ntotal}")
 
 if __name__ == "__main__":
-    run_embedding_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or update the local FAISS store")
+    parser.add_argument("--full", action="store_true",
+                        help="rebuild the whole store instead of applying changed chunks")
+    args = parser.parse_args()
+    run_embedding_pipeline(full=args.full)
\ No newline at end of file
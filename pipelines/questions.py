@@ -0,0 +1,39 @@
+import json
+
+# Question files in JSONL, shared by the batch pipeline, the API warm-up and
+# the benchmarks; kept free of heavy imports so reading one stays cheap
+
+def parse_question(line):
+    """(id, question) from one JSONL line.
+
+    Accepts {"question": ...} or {"query": ...} objects, backlog style
+    {"request_id", "title", "body"} records, bare JSON strings and plain text.
+    Raises ValueError for any other JSON value.
+    """
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        record = line.strip()
+    if isinstance(record, str):
+        return None, record
+    if not isinstance(record, dict):
+        raise ValueError(f"Expected a JSON object or string, got {line.strip()[:80]}")
+    question = (record.get("question") or record.get("query")
+                or record.get("body") or record.get("title") or "")
+    if not isinstance(question, str):
+        raise ValueError(f"Expected the question to be a string, got {json.dumps(question)[:80]}")
+    return record.get("id") or record.get("request_id"), question
+
+def read_questions(lines):
+    """(position, id, question) for each non-blank line, with the ValueError
+    in place of the question for a line that is not one"""
+    position = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record_id, question = parse_question(line)
+        except ValueError as e:
+            record_id, question = None, e
+        yield position, record_id, question
+        position += 1
@@ -1,21 +1,19 @@
 import os
-from openai import AzureOpenAI
 from dotenv import load_dotenv
 import sys
 sys.path.append('.')
-from vectorstore.vector_store import load_vector_store, search_similar_chunks
+from vectorstore.vector_store import get_vector_store, search_similar_chunks
+from agents.validation_agent import relevant_chunks
+from pipelines.context_builder import build_context
+from monitoring.metrics import stage, record_usage
+from core.clients import get_openai_client
 
 
 load_dotenv('config/.env')
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
-
 def generate_answer(query, context_chunks):
-    context = "\n\n".join([chunk['text'] for chunk in context_chunks])
+    with stage("prompt_build"):
+        context, _, _ = build_context(context_chunks)
     
     system_prompt = """You are a helpful Medicare healthcare assistant.
     Answer questions ONLY based on the provided context.
@@ -29,15 +27,17 @@ Question: {query}
 
 Answer based only on the context above:"""
     
-    response = client.chat.completions.create(
-        model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0.1,
-        max_tokens=500
-    )
+    with stage("generate"):
+        response = get_openai_client().chat.completions.create(
+            model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.1,
+            max_tokens=500
+        )
+        record_usage(response.usage)
     
     return response.choices[0].message.content
 
@@ -45,11 +45,14 @@ def rag_query(query):
     print(f"\nQuery: {query}")
     print("-" * 50)
     
-    index, chunks = load_vector_store()
-    relevant_chunks = search_similar_chunks(query, index, chunks, top_k=3)
-    print(f"Retrieved {len(relevant_chunks)} relevant chunks")
+    index, chunks = get_vector_store()
+    context_chunks = relevant_chunks(search_similar_chunks(query, index, chunks, top_k=3))
+    print(f"Retrieved {len(context_chunks)} relevant chunks")
     
-    answer = generate_answer(query, relevant_chunks)
+    if context_chunks:
+        answer = generate_answer(query, context_chunks)
+    else:
+        answer = "I don't have information about that."
     
     print(f"\nAnswer: {answer}")
     print("-" * 50)
@@ -57,7 +60,7 @@ def rag_query(query):
     return {
         "query": query,
         "answer": answer,
-        "sources": [c['category'] for c in relevant_chunks]
+        "sources": [c['category'] for c in context_chunks]
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from dotenv import load_dotenv
+import sys
+sys.path.append('.')
+from embeddings.cache import embed_with_cache
+from vectorstore.filters import last_updated
+from pipelines.streaming import iter_json_records
+
+load_dotenv('config/.env')
+
+# id -> content hash of what is in the index, so re-runs only send the difference
+MANIFEST_PATH = os.getenv("AZURE_SEARCH_MANIFEST_PATH", "data/embeddings/azure_search_manifest.json")
+
+# Azure AI Search accepts at most 1000 actions and 16 MB per indexing request
+UPLOAD_BATCH_SIZE = int(os.getenv("AZURE_SEARCH_BATCH_SIZE", "500"))
+UPLOAD_BATCH_BYTES = int(os.getenv("AZURE_SEARCH_BATCH_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_WORKERS = int(os.getenv("AZURE_SEARCH_UPLOAD_WORKERS", "4"))
+MAX_RETRIES = int(os.getenv("AZURE_SEARCH_MAX_RETRIES", "5"))
+RETRY_BASE_DELAY = float(os.getenv("AZURE_SEARCH_RETRY_BASE_DELAY", "1.0"))
+
+# Changed chunks embedded per embed_with_cache call, and manifest saves
+EMBED_WINDOW = int(os.getenv("AZURE_SEARCH_EMBED_WINDOW", "2000"))
+SAVE_EVERY_BATCHES = 10
+
+# Per-document status codes worth retrying (conflict, throttling, unavailable)
+RETRIABLE_STATUS = {409, 422, 429, 503}
+
+def document_hash(chunk):
+    """Hash of everything that ends up in a chunk's search document"""
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "")
+    payload = json.dumps([chunk['text'], chunk['category'], chunk['source'], last_updated(chunk),
+                          deployment])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_manifest(index_name, path=MANIFEST_PATH):
+    """{id: hash} last uploaded to this index, empty if unknown"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    return manifest["documents"] if manifest.get("index") == index_name else {}
+
+def save_manifest(index_name, documents, path=MANIFEST_PATH):
+    """Write the manifest atomically"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({"index": index_name, "documents": documents}, f)
+    os.replace(tmp_path, path)
+
+def diff_chunks(chunks_path, manifest, full=False):
+    """(changed chunks with their hashes, ids no longer present, unchanged count);
+    full=True counts every chunk as changed"""
+    changed, seen, unchanged = [], set(), 0
+    for chunk, _ in iter_json_records(chunks_path):
+        seen.add(chunk['chunk_id'])
+        digest = document_hash(chunk)
+        if not full and manifest.get(chunk['chunk_id']) == digest:
+            unchanged += 1
+        else:
+            changed.append((chunk, digest))
+    removed = [doc_id for doc_id in manifest if doc_id not in seen]
+    return changed, removed, unchanged
+
+def size_bounded_batches(documents, max_size=UPLOAD_BATCH_SIZE, max_bytes=UPLOAD_BATCH_BYTES):
+    """Group documents so no request exceeds the action count or payload size"""
+    batch, batch_bytes = [], 0
+    for document in documents:
+        size = len(json.dumps(document))
+        if batch and (len(batch) >= max_size or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(document)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+def send_batch(search_client, action, documents):
+    """Upload or delete one batch, retrying the whole request on transport and
+    5xx/429 errors and individual documents on retriable status codes.
+    Returns (succeeded ids, {failed id: error message})."""
+    send = search_client.upload_documents if action == "upload" else search_client.delete_documents
+    pending = {d['id']: d for d in documents}
+    succeeded, failed = [], {}
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            # Retries are ours alone: the SDK policy would retry 429/5xx under this loop
+            results = send(list(pending.values()), retry_total=0)
+        except (HttpResponseError, ServiceRequestError, ServiceResponseError) as e:
+            status = getattr(e, "status_code", None)
+            if attempt == MAX_RETRIES or (status is not None and status < 500 and status != 429):
+                failed.update({doc_id: str(e) for doc_id in pending})
+                return succeeded, failed
+        else:
+            retry = {}
+            for result in results:
+                if result.succeeded:
+                    succeeded.append(result.key)
+                elif result.status_code in RETRIABLE_STATUS and attempt < MAX_RETRIES:
+                    retry[result.key] = pending[result.key]
+                else:
+                    failed[result.key] = result.error_message
+            pending = retry
+            if not pending:
+                return succeeded, failed
+
+        delay = RETRY_BASE_DELAY * (2 ** attempt)
+        print(f"Retrying {len(pending)} {action}s in {delay:.1f}s...")
+        time.sleep(delay)
+    return succeeded, failed
+
+def iter_documents(changed):
+    """Search documents for changed chunks, embedding a window at a time"""
+    for start in range(0, len(changed), EMBED_WINDOW):
+        window = changed[start:start + EMBED_WINDOW]
+        embeddings = embed_with_cache([chunk['text'] for chunk, _ in window], prune=False)
+        for (chunk, _), embedding in zip(window, embeddings):
+            yield {
+                "id": chunk['chunk_id'],
+                "content": chunk['text'],
+                "category": chunk['category'],
+                "source": chunk['source'],
+                "last_updated": f"{last_updated(chunk)[:10]}T00:00:00Z" if last_updated(chunk) else None,
+                "embedding": embedding.tolist()
+            }
+
+def sync_index(search_client, index_name, chunks_path, full=False, workers=UPLOAD_WORKERS,
+               manifest_path=MANIFEST_PATH):
+    """Bring the search index in line with the chunks file.
+
+    Only chunks whose content hash differs from the manifest are embedded
+    and uploaded, and ids that disappeared from the chunks are deleted, so
+    the work scales with the size of the change. Batches go out in parallel;
+    the manifest records each batch as it lands, so an interrupted run
+    resumes where it stopped. Returns counts of what was done.
+    """
+    manifest = load_manifest(index_name, manifest_path)
+    changed, removed, unchanged = diff_chunks(chunks_path, manifest, full)
+    print(f"{len(changed)} new or changed, {len(removed)} removed, {unchanged} unchanged")
+
+    hashes = {chunk['chunk_id']: digest for chunk, digest in changed}
+    stats = {"uploaded": 0, "deleted": 0, "unchanged": unchanged, "failed": 0}
+    batches_done = 0
+
+    def record(action, succeeded, failed):
+        nonlocal batches_done
+        for doc_id in succeeded:
+            if action == "upload":
+                manifest[doc_id] = hashes[doc_id]
+            else:
+                manifest.pop(doc_id, None)
+        stats["uploaded" if action == "upload" else "deleted"] += len(succeeded)
+        stats["failed"] += len(failed)
+        for doc_id, error in list(failed.items())[:3]:
+            print(f"Failed to {action} {doc_id}: {error}")
+        batches_done += 1
+        if batches_done % SAVE_EVERY_BATCHES == 0:
+            save_manifest(index_name, manifest, manifest_path)
+
+    work = [("delete", batch) for batch in
+            size_bounded_batches({"id": doc_id} for doc_id in removed)]
+    pending = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            def submit(action, batch):
+                pending[executor.submit(send_batch, search_client, action, batch)] = action
+
+            def drain(limit):
+                while len(pending) > limit:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(pending.pop(future), *future.result())
+
+            for action, batch in work:
+                submit(action, batch)
+            # Documents are built lazily, so only a few batches of vectors are in memory
+            for batch in size_bounded_batches(iter_documents(changed)):
+                submit("upload", batch)
+                drain(2 * workers)
+            drain(0)
+    finally:
+        save_manifest(index_name, manifest, manifest_path)
+
+    print(f"Uploaded {stats['uploaded']}, deleted {stats['deleted']}, "
+          f"skipped {stats['unchanged']} unchanged, {stats['failed']} failed")
+    return stats
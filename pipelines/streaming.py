@@ -0,0 +1,140 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+READ_BUFFER_SIZE = 1 << 20
+CHECKPOINT_EVERY = int(os.getenv("INGEST_CHECKPOINT_EVERY", "1000"))
+
+def _iter_json_array(f):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof, started = '', 0, False, False
+
+    while True:
+        # Skip whitespace and separators, refilling the buffer as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            more = f.read(READ_BUFFER_SIZE)
+            buffer, pos, eof = buffer[pos:] + more, 0, not more
+        if pos >= len(buffer):
+            return
+
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Record continues past the buffer - read more and retry
+            if eof:
+                raise
+            more = f.read(READ_BUFFER_SIZE)
+            buffer, pos, eof = buffer[pos:] + more, 0, not more
+            continue
+        yield record
+        pos = end
+
+def iter_json_records(filepath, start_offset=0):
+    """Yield (record, offset) from a JSONL file or a JSON array, one at a time.
+
+    For JSONL the offset is the byte position after the record, so a run can
+    resume with start_offset; for JSON arrays it is None.
+    """
+    if filepath.endswith('.jsonl'):
+        with open(filepath, 'rb') as f:
+            f.seek(start_offset)
+            for line in iter(f.readline, b''):
+                if line.strip():
+                    yield json.loads(line), f.tell()
+    else:
+        with open(filepath, 'r') as f:
+            for record in _iter_json_array(f):
+                yield record, None
+
+def load_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return {"records": 0, "input_offset": 0, "output_offset": 0}
+    with open(checkpoint_path, 'r') as f:
+        return json.load(f)
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def run_streaming_stage(input_path, output_path, transform, checkpoint_every=CHECKPOINT_EVERY,
+                        workers=1):
+    """Stream records through transform into a JSONL file with constant memory.
+
+    transform maps one input record to an iterable of output records; with
+    workers > 1 it runs in a process pool over bounded batches of records.
+    Progress is checkpointed next to the output, and an interrupted run
+    resumes from the last checkpoint when started again.
+    """
+    checkpoint_path = output_path + '.checkpoint'
+    checkpoint = load_checkpoint(checkpoint_path)
+    resumed = checkpoint["records"]
+    if resumed:
+        print(f"Resuming from record {resumed}")
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    mode = 'r+b' if resumed and os.path.exists(output_path) else 'wb'
+    records = resumed
+    written = 0
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with open(output_path, mode) as out:
+            # Drop anything written after the last checkpoint
+            out.seek(checkpoint["output_offset"])
+            out.truncate()
+
+            source = iter_json_records(input_path, checkpoint["input_offset"])
+            if not input_path.endswith('.jsonl'):
+                # JSON arrays cannot be seeked into - skip processed records
+                for _ in zip(range(resumed), source):
+                    pass
+
+            while True:
+                batch = list(islice(source, checkpoint_every))
+                if not batch:
+                    break
+                if executor:
+                    results = executor.map(transform, [r for r, _ in batch],
+                                           chunksize=max(1, len(batch) // (workers * 4)))
+                else:
+                    results = map(transform, [r for r, _ in batch])
+
+                for (_, input_offset), outputs in zip(batch, results):
+                    for result in outputs:
+                        out.write(json.dumps(result, ensure_ascii=False).encode('utf-8') + b'\n')
+                        written += 1
+                    records += 1
+
+                    if records % checkpoint_every == 0:
+                        out.flush()
+                        os.fsync(out.fileno())
+                        save_checkpoint(checkpoint_path, {
+                            "records": records,
+                            "input_offset": input_offset or 0,
+                            "output_offset": out.tell()
+                        })
+                        print(f"Processed {records} records")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"Streamed {records - resumed} records ({written} outputs) to {output_path}")
+    return records
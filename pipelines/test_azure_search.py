@@ -1,30 +1,14 @@
-import os
-from azure.search.documents import SearchClient
-from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
 from dotenv import load_dotenv
+import sys
+sys.path.append('.')
+from embeddings.query_cache import embed_query
+from core.clients import get_search_client
 
 load_dotenv('config/.env')
 
-openai_client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
-
-search_client = SearchClient(
-    endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
-    index_name=os.getenv("AZURE_SEARCH_INDEX"),
-    credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY"))
-)
-
 def search(query):
     # Generate embedding
-    response = openai_client.embeddings.create(
-        input=query,
-        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    )
-    embedding = response.data[0].embedding
+    embedding = embed_query(query)
 
     # Vector search
     from azure.search.documents.models import VectorizedQuery
@@ -34,7 +18,7 @@ def search(query):
         fields="embedding"
     )
 
-    results = search_client.search(
+    results = get_search_client().search(
         search_text=query,
         vector_queries=[vector_query],
         top=3
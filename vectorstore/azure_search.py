@@ -0,0 +1,42 @@
+import sys
+sys.path.append('.')
+from vectorstore.filters import odata_filter
+from core.clients import get_search_client
+
+# Keyword and vector searches against Azure AI Search, as separate requests
+# so the vector results keep a cosine similarity for the relevance gate
+# (a hybrid query only returns fused ranking scores). The API's async path
+# sends the same queries with its async client.
+
+SEARCH_FIELDS = ["id", "content", "category", "source"]
+
+def azure_similarity(search_score):
+    """Cosine similarity behind a vector query's @search.score, which for
+    the cosine metric is 1 / (1 + (1 - similarity))"""
+    return 2 - 1 / search_score
+
+def search_result(r, vector=False):
+    """A search result in the shape of the local retriever's results"""
+    return {"chunk_id": r["id"], "content": r["content"], "category": r["category"],
+            "source": r["source"], "score": r["@search.score"],
+            "similarity_score": azure_similarity(r["@search.score"]) if vector else None}
+
+def keyword_query(query, top_k, filters=None):
+    """Search arguments for the full-text half of hybrid search"""
+    return {"search_text": query, "select": SEARCH_FIELDS, "filter": odata_filter(filters),
+            "top": top_k}
+
+def vector_query(embedding, top_k, filters=None):
+    """Search arguments for the vector half of hybrid search"""
+    from azure.search.documents.models import VectorizedQuery
+    return {"search_text": None,
+            "vector_queries": [VectorizedQuery(vector=embedding, k_nearest_neighbors=top_k,
+                                               fields="embedding")],
+            "select": SEARCH_FIELDS, "filter": odata_filter(filters), "top": top_k}
+
+def keyword_search(query, top_k, filters=None):
+    return [search_result(r) for r in get_search_client().search(**keyword_query(query, top_k, filters))]
+
+def vector_search(embedding, top_k, filters=None):
+    return [search_result(r, vector=True)
+            for r in get_search_client().search(**vector_query(embedding, top_k, filters))]
@@ -0,0 +1,70 @@
+import math
+import re
+from collections import Counter, defaultdict
+import numpy as np
+
+# Okapi BM25 parameters
+K1 = 1.5
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "if", "in", "is", "it", "my", "of", "on", "or", "the",
+    "to", "what", "when", "which", "who", "with", "you", "your", "question", "answer"
+}
+
+def tokenize(text):
+    """Lowercased alphanumeric terms without stopwords"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+def build_bm25_index(texts, ids=None):
+    """Build an inverted index over texts for BM25 scoring.
+
+    Searches return ids[i] for texts[i] when ids are given, positions otherwise.
+    """
+    postings = defaultdict(lambda: ([], []))
+    doc_lengths = np.zeros(len(texts), dtype='float32')
+
+    for doc, text in enumerate(texts):
+        terms = tokenize(text)
+        doc_lengths[doc] = len(terms)
+        for term, tf in Counter(terms).items():
+            postings[term][0].append(doc)
+            postings[term][1].append(tf)
+
+    n = len(texts)
+    index = {}
+    for term, (docs, tfs) in postings.items():
+        idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+        index[term] = (np.array(docs, dtype='int64'), np.array(tfs, dtype='float32'), idf)
+
+    avgdl = float(doc_lengths.mean()) if n else 1.0
+    return {
+        "postings": index,
+        "size": n,
+        "ids": None if ids is None else np.asarray(ids, dtype='int64'),
+        # Length normalisation term of the BM25 denominator, per document
+        "doc_norms": K1 * (1 - B + B * doc_lengths / (avgdl or 1.0))
+    }
+
+def bm25_search(bm25, query, top_k=10, mask=None):
+    """(position, score) pairs for the best matching texts, best first.
+
+    mask is a boolean array over ids (positions without ids); texts it
+    excludes are never returned.
+    """
+    scores = np.zeros(bm25["size"], dtype='float32')
+    for term in set(tokenize(query)):
+        if term not in bm25["postings"]:
+            continue
+        docs, tfs, idf = bm25["postings"][term]
+        scores[docs] += idf * tfs * (K1 + 1) / (tfs + bm25["doc_norms"][docs])
+
+    ids = bm25.get("ids")
+    if mask is not None:
+        scores[~(mask if ids is None else mask[ids])] = 0.0
+
+    matched = np.nonzero(scores)[0]
+    top = matched[np.argsort(-scores[matched], kind='stable')[:top_k]]
+    return [(int(doc if ids is None else ids[doc]), float(scores[doc])) for doc in top]
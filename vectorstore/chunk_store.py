@@ -0,0 +1,73 @@
+import json
+import mmap
+import os
+import numpy as np
+
+def write_chunk_store(chunks, path, offsets_path):
+    """Write chunks as JSON lines plus an array of line offsets.
+
+    Files are written to .tmp paths; the caller renames them into place.
+    """
+    offsets = [0]
+    with open(path + '.tmp', 'wb') as f:
+        for chunk in chunks:
+            line = json.dumps(chunk, ensure_ascii=False).encode('utf-8') + b'\n'
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    with open(offsets_path + '.tmp', 'wb') as f:
+        np.save(f, np.array(offsets, dtype='int64'))
+
+def append_chunks(chunks, path, offsets_path):
+    """Append chunks to an existing store in place, returning their positions.
+
+    Records already written never move, so processes that mapped the files
+    before the append keep reading valid data. Bytes past the last recorded
+    offset (left by an interrupted append) are overwritten; the offsets file
+    is replaced atomically once the records are on disk.
+    """
+    offsets = np.load(offsets_path).tolist()
+    first = len(offsets) - 1
+    with open(path, 'r+b') as f:
+        f.seek(offsets[-1])
+        f.truncate()
+        for chunk in chunks:
+            line = json.dumps(chunk, ensure_ascii=False).encode('utf-8') + b'\n'
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+        f.flush()
+        os.fsync(f.fileno())
+    with open(offsets_path + '.tmp', 'wb') as f:
+        np.save(f, np.array(offsets, dtype='int64'))
+    os.replace(offsets_path + '.tmp', offsets_path)
+    return list(range(first, first + len(chunks)))
+
+class ChunkStore:
+    """Read-only list of chunks backed by memory-mapped files.
+
+    Only the requested records are parsed, and the pages are shared
+    between every worker process that maps the same files. An updated store
+    keeps superseded records until it is compacted; live holds the positions
+    still in the index, or None when every record is.
+    """
+
+    def __init__(self, path, offsets_path):
+        self.live = None
+        self._offsets = np.load(offsets_path, mmap_mode='r')
+        with open(path, 'rb') as f:
+            # mmap cannot map an empty file
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return json.loads(self._data[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
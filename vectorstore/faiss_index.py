@@ -0,0 +1,157 @@
+import math
+import os
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv('config/.env')
+
+# Index built by the embedding pipeline: flat | ivf_flat | ivf_pq | hnsw
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+
+# Stored vector encoding for flat, ivf_flat and hnsw: float32 | float16 | int8
+# (ivf_pq is already compressed)
+FAISS_VECTOR_ENCODING = os.getenv("FAISS_VECTOR_ENCODING", "float32")
+
+SCALAR_QUANTIZERS = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit
+}
+
+# Build settings. FAISS_IVF_NLIST=0 picks ~4*sqrt(n) lists; FAISS_PQ_M must
+# divide the embedding dimension
+IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "64"))
+PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+
+# Search settings, applied when an index is loaded
+IVF_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+# FAISS wants roughly this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+def default_nlist(n):
+    return max(1, min(int(4 * math.sqrt(n)), n // MIN_POINTS_PER_CENTROID))
+
+def normalize(vectors):
+    """Unit-length float32 copy of vectors, so inner product is cosine similarity"""
+    vectors = np.array(vectors, dtype='float32', copy=True, ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def create_index(embeddings_array, index_type=FAISS_INDEX_TYPE, nlist=IVF_NLIST,
+                 encoding=FAISS_VECTOR_ENCODING, ids=None):
+    """Build and fill an inner-product index of the given type over normalized vectors.
+
+    With ids, the index is wrapped in an IndexIDMap2 so searches return those
+    ids instead of positions, and vectors can later be added and removed by id.
+    """
+    if encoding != "float32" and encoding not in SCALAR_QUANTIZERS:
+        raise ValueError(f"Unknown vector encoding: {encoding}")
+    qtype = SCALAR_QUANTIZERS.get(encoding)
+    embeddings_array = normalize(embeddings_array)
+    n, dimension = embeddings_array.shape
+
+    # Too few vectors to train quantizers - an exhaustive scan is fast anyway
+    if index_type == "ivf_pq" and n < MIN_POINTS_PER_CENTROID * 2 ** PQ_NBITS:
+        print(f"Only {n} vectors, too few to train {index_type} - using flat")
+        index_type = "flat"
+    if index_type == "ivf_flat" and n < MIN_POINTS_PER_CENTROID:
+        print(f"Only {n} vectors, too few to train {index_type} - using flat")
+        index_type = "flat"
+
+    if index_type == "flat" and qtype is not None:
+        index = faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings_array)
+    elif index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or default_nlist(n)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat" and qtype is not None:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, qtype,
+                                                  faiss.METRIC_INNER_PRODUCT)
+        elif index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, PQ_M, PQ_NBITS,
+                                     faiss.METRIC_INNER_PRODUCT)
+        print(f"Training {index_type} index with {nlist} lists...")
+        index.train(embeddings_array)
+    elif index_type == "hnsw" and qtype is not None:
+        index = faiss.IndexHNSWSQ(dimension, qtype, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.train(embeddings_array)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        raise ValueError(f"Unknown FAISS index type: {index_type}")
+
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(embeddings_array, np.asarray(ids, dtype='int64'))
+    else:
+        index.add(embeddings_array)
+    configure_index(index)
+    return index
+
+def base_index(index):
+    """The index doing the search, unwrapped from an ID map"""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+def index_ids(index):
+    """Ids held by an ID-mapped index, or None if results are positions"""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map)
+    return None
+
+def to_similarity(index, distances):
+    """Cosine similarity from search results, higher is better.
+
+    Indexes built before the switch to inner product hold the same unit
+    vectors under L2, where squared distance d maps to 1 - d / 2.
+    """
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return distances
+    return 1.0 - distances / 2.0
+
+def index_type_name(index):
+    """Index type of a built or loaded index"""
+    if isinstance(base_index(index), faiss.IndexHNSW):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # try_extract_index_ivf returns the generic IndexIVF wrapper
+        return "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+    return "flat"
+
+def search_parameters(index, selector, fraction=1.0):
+    """Search parameters restricting results to the ids the selector accepts.
+
+    IVF indexes probe more lists the smaller the accepted fraction, so a
+    narrow filter still finds enough candidates.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = min(ivf.nlist, math.ceil(ivf.nprobe / max(fraction, 1e-6)))
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    base = base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+def configure_index(index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Apply search-time settings for the index type"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    base = base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = ef_search
+    return index
@@ -0,0 +1,39 @@
+from datetime import date
+
+# Metadata filters for retrieval, as a dict with any of
+#   category       exact category name
+#   updated_after  ISO date; chunks last updated on or after it
+# None (or an empty dict) means no filter.
+
+def make_filters(category=None, updated_after=None):
+    """Filters dict from optional values, None if none are set"""
+    filters = {}
+    if category:
+        filters["category"] = category
+    if updated_after:
+        if not isinstance(updated_after, date):
+            updated_after = date.fromisoformat(str(updated_after)[:10])
+        filters["updated_after"] = updated_after.isoformat()
+    return filters or None
+
+def filter_key(filters):
+    """Stable string for a filter, "" for none, e.g. to keep cached answers apart"""
+    if not filters:
+        return ""
+    return "|".join(f"{name}={filters[name]}" for name in sorted(filters))
+
+def last_updated(chunk):
+    """A chunk's last_updated date string, None if it has none"""
+    return (chunk.get("metadata") or {}).get("last_updated")
+
+def odata_filter(filters):
+    """The filters as an Azure AI Search OData $filter expression, or None"""
+    if not filters:
+        return None
+    clauses = []
+    if filters.get("category"):
+        # OData escapes a quote inside a string literal by doubling it
+        clauses.append("category eq '{}'".format(filters["category"].replace("'", "''")))
+    if filters.get("updated_after"):
+        clauses.append(f"last_updated ge {filters['updated_after']}T00:00:00Z")
+    return " and ".join(clauses) or None
@@ -0,0 +1,32 @@
+import os
+import time
+
+# Marker touched by the indexing pipelines, so caches of answers built on
+# an older local index can tell it was rebuilt. It is a local file, so
+# processes on other machines only see it for a local store they share;
+# for Azure AI Search use azure_index_version instead.
+INDEX_VERSION_PATH = 'data/embeddings/index_version'
+
+def bump_index_version():
+    """Record that the index was rebuilt"""
+    os.makedirs(os.path.dirname(INDEX_VERSION_PATH), exist_ok=True)
+    tmp_path = INDEX_VERSION_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, INDEX_VERSION_PATH)
+
+def current_index_version():
+    """Current index version, or None if no pipeline has recorded one"""
+    try:
+        with open(INDEX_VERSION_PATH, 'r') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def azure_index_version(index_name=None):
+    """Version of the Azure AI Search index as every replica sees it: its
+    document count and storage size, which the service refreshes within a
+    few minutes of documents being uploaded or deleted"""
+    from core.clients import get_search_index_client
+    stats = get_search_index_client().get_index_statistics(index_name or os.getenv("AZURE_SEARCH_INDEX"))
+    return f"{stats.document_count}:{stats.storage_size}"
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import sys
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+sys.path.append('.')
+from embeddings.cache import embed_with_cache
+from vectorstore.chunk_store import ChunkStore, append_chunks
+from vectorstore.faiss_index import base_index, index_ids, normalize
+from vectorstore.index_version import bump_index_version
+from vectorstore.vector_store import (INDEX_PATH, METADATA_PATH, OFFSETS_PATH, LOG_PATH,
+                                      apply_log, encode_vector, read_log)
+
+load_dotenv('config/.env')
+
+# Rebuild the store without superseded records once they are this share of it
+COMPACT_RATIO = float(os.getenv("VECTOR_STORE_COMPACT_RATIO", "0.25"))
+
+def chunk_hash(chunk):
+    """Hash of a chunk's stored record, to tell whether it changed"""
+    record = {k: v for k, v in chunk.items() if k not in ('embedding', 'embedding_index')}
+    return hashlib.sha256(json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+
+class MutableVectorStore:
+    """The local store opened for in-place updates, keyed by chunk_id.
+
+    Each version of a chunk is appended to the chunk metadata and its vector
+    is added to the ID-mapped index under that position; replacing or
+    deleting a chunk removes its old position from the index. Every update
+    is appended to the write log before it returns, and commit() folds the
+    log into the index file (or compacts the store when due), so readers
+    are back to memory-mapping the index once an update run ends. Files
+    are only appended to or replaced whole, so readers never see a partial
+    write.
+    """
+
+    def __init__(self):
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(METADATA_PATH):
+            raise FileNotFoundError(f"No vector store at {METADATA_PATH}")
+        index = faiss.read_index(INDEX_PATH)
+        if index_ids(index) is None:
+            raise ValueError("Vector store index is not ID-mapped")
+        if isinstance(base_index(index), faiss.IndexHNSW):
+            raise ValueError("HNSW indexes cannot remove vectors")
+
+        operations = read_log()
+        self.chunks = ChunkStore(METADATA_PATH, OFFSETS_PATH)
+        apply_log(index, operations, self.chunks)
+        self.index = index
+        self.logged = len(operations)
+        self.positions = {self.chunks[int(p)]['chunk_id']: int(p) for p in index_ids(index)}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def chunk_hashes(self):
+        """{chunk_id: chunk_hash} of the live chunks"""
+        return {chunk_id: chunk_hash(self.chunks[p]) for chunk_id, p in self.positions.items()}
+
+    def dead_ratio(self):
+        """Share of the stored records that are superseded or deleted"""
+        return 1 - len(self.positions) / len(self.chunks) if len(self.chunks) else 0.0
+
+    def upsert(self, chunks):
+        """Add chunks, replacing any stored under the same chunk_id"""
+        chunks = list({c['chunk_id']: c for c in chunks}.values())
+        if not chunks:
+            return 0
+        vectors = normalize(embed_with_cache([c['text'] for c in chunks], prune=False))
+
+        first = len(self.chunks)
+        records = [{**{k: v for k, v in c.items() if k != 'embedding'}, 'embedding_index': first + i}
+                   for i, c in enumerate(chunks)]
+        positions = append_chunks(records, METADATA_PATH, OFFSETS_PATH)
+        self.chunks = ChunkStore(METADATA_PATH, OFFSETS_PATH)
+
+        replaced = [(c['chunk_id'], self.positions[c['chunk_id']]) for c in chunks
+                    if c['chunk_id'] in self.positions]
+        self._log([{"op": "delete", "id": p, "chunk_id": chunk_id} for chunk_id, p in replaced] +
+                  [{"op": "upsert", "id": p, "chunk_id": c['chunk_id'], "vector": encode_vector(v)}
+                   for p, c, v in zip(positions, chunks, vectors)])
+
+        if replaced:
+            self.index.remove_ids(np.array([p for _, p in replaced], dtype='int64'))
+        self.index.add_with_ids(vectors, np.array(positions, dtype='int64'))
+        self.positions.update((c['chunk_id'], p) for c, p in zip(chunks, positions))
+        return len(chunks)
+
+    def delete(self, chunk_ids):
+        """Remove chunks by chunk_id, ignoring ids not in the store"""
+        removed = [(chunk_id, self.positions[chunk_id]) for chunk_id in set(chunk_ids)
+                   if chunk_id in self.positions]
+        if not removed:
+            return 0
+        self._log([{"op": "delete", "id": p, "chunk_id": chunk_id} for chunk_id, p in removed])
+        self.index.remove_ids(np.array([p for _, p in removed], dtype='int64'))
+        for chunk_id, _ in removed:
+            del self.positions[chunk_id]
+        return len(removed)
+
+    def _log(self, operations):
+        with open(LOG_PATH, 'a') as f:
+            f.writelines(json.dumps(operation) + '\n' for operation in operations)
+            f.flush()
+            os.fsync(f.fileno())
+        self.logged += len(operations)
+        bump_index_version()
+
+    def commit(self):
+        """Compact if due, otherwise checkpoint any logged updates; returns
+        which one ran, if any"""
+        if self.dead_ratio() > COMPACT_RATIO:
+            self.compact()
+            return "compact"
+        if self.logged:
+            self.checkpoint()
+            return "checkpoint"
+        return None
+
+    def checkpoint(self):
+        """Write the index with every logged update applied, then empty the log"""
+        faiss.write_index(self.index, INDEX_PATH + '.tmp')
+        os.replace(INDEX_PATH + '.tmp', INDEX_PATH)
+        # Readers that load the new index with the old log replay it harmlessly
+        with open(LOG_PATH + '.tmp', 'w'):
+            pass
+        os.replace(LOG_PATH + '.tmp', LOG_PATH)
+        self.logged = 0
+        print(f"Vector store checkpointed with {self.index.ntotal} vectors")
+
+    def compact(self):
+        """Rebuild the store from the live chunks only, renumbering them.
+
+        Their embeddings all come from the embedding cache, so this makes no
+        API calls.
+        """
+        # The pipeline owns the full build; imported here as it imports this module
+        from pipelines.embedding_pipeline import build_vector_store, save_vector_store
+        live = [self.chunks[p] for p in sorted(self.positions.values())]
+        dead = len(self.chunks) - len(live)
+        index, chunks = build_vector_store(live)
+        save_vector_store(index, chunks)
+        self._open()
+        print(f"Vector store compacted, dropped {dead} superseded records")
@@ -0,0 +1,196 @@
+import os
+import sys
+import threading
+from collections import Counter
+import numpy as np
+from dotenv import load_dotenv
+sys.path.append('.')
+from vectorstore.bm25 import build_bm25_index, bm25_search
+from vectorstore.filters import filter_key, last_updated
+from embeddings.query_cache import embed_query, embed_queries
+from agents.validation_agent import is_relevant
+
+load_dotenv('config/.env')
+
+# vectorstore.vector_store (and with it faiss) is imported inside the local
+# search functions, so the default Azure retriever never loads it
+
+# "azure" uses Azure AI Search; "local" the FAISS store only; "hybrid"
+# fuses FAISS with an in-process BM25 index
+RETRIEVER = os.getenv("RETRIEVER", "azure")
+
+# Candidates taken from each ranking before fusion, and the RRF constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# (chunks, bm25 index) for the currently loaded vector store
+_bm25 = None
+_bm25_lock = threading.Lock()
+
+def get_bm25_index(chunks):
+    """BM25 index over the store's chunks, rebuilt when the store reloads"""
+    global _bm25
+    cached = _bm25
+    if cached is None or cached[0] is not chunks:
+        with _bm25_lock:
+            if _bm25 is None or _bm25[0] is not chunks:
+                # An updated store also holds superseded records; index only
+                # the ones still in the FAISS index, under their positions
+                live = getattr(chunks, 'live', None)
+                if live is None:
+                    bm25 = build_bm25_index([c['text'] for c in chunks])
+                else:
+                    bm25 = build_bm25_index([chunks[p]['text'] for p in live], ids=live)
+                _bm25 = (chunks, bm25)
+            cached = _bm25
+    return cached[1]
+
+# (chunks, per-position filter attributes) for the currently loaded vector store
+_attributes = None
+_attributes_lock = threading.Lock()
+
+# Filter masks kept per store, for the category partitions and dates in use
+MAX_CACHED_MASKS = 256
+
+def _live_positions(chunks):
+    live = getattr(chunks, 'live', None)
+    return range(len(chunks)) if live is None else live
+
+def get_filter_attributes(chunks):
+    """Category and last_updated per position, and which positions are live,
+    as arrays built once per store load"""
+    global _attributes
+    cached = _attributes
+    if cached is None or cached[0] is not chunks:
+        with _attributes_lock:
+            if _attributes is None or _attributes[0] is not chunks:
+                categories = np.full(len(chunks), None, dtype=object)
+                updated = np.full(len(chunks), np.datetime64('NaT'), dtype='datetime64[D]')
+                live = np.zeros(len(chunks), dtype=bool)
+                for position in _live_positions(chunks):
+                    chunk = chunks[position]
+                    categories[position] = chunk['category']
+                    if last_updated(chunk):
+                        updated[position] = np.datetime64(last_updated(chunk)[:10], 'D')
+                    live[position] = True
+                _attributes = (chunks, {"category": categories, "updated": updated,
+                                        "live": live, "masks": {}})
+            cached = _attributes
+    return cached[1]
+
+def get_filter_mask(chunks, filters):
+    """Boolean array over positions of the live chunks matching filters, None
+    without filters. Each distinct filter is computed once per store."""
+    if not filters:
+        return None
+    attributes = get_filter_attributes(chunks)
+    key = filter_key(filters)
+    mask = attributes["masks"].get(key)
+    if mask is None:
+        mask = attributes["live"].copy()
+        if filters.get("category"):
+            mask &= attributes["category"] == filters["category"]
+        if filters.get("updated_after"):
+            # Comparisons with NaT are false, so undated chunks are excluded
+            mask &= attributes["updated"] >= np.datetime64(filters["updated_after"], 'D')
+        if len(attributes["masks"]) >= MAX_CACHED_MASKS:
+            attributes["masks"].clear()
+        attributes["masks"][key] = mask
+    return mask
+
+def category_counts():
+    """{category: live chunk count} in the local store"""
+    from vectorstore.vector_store import get_vector_store
+    _, chunks = get_vector_store()
+    attributes = get_filter_attributes(chunks)
+    return dict(Counter(attributes["category"][attributes["live"]].tolist()))
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of positions into (position, score) pairs, best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def hybrid_rank(bm25, query, dense, top_k, mask=None):
+    """Fuse dense hits with BM25 hits; returns the fused, relevant dense and
+    keyword (position, score) pairs.
+
+    Dense hits below the relevance threshold are dropped first, and if none
+    is left nothing is returned: keyword hits alone do not make a query
+    answerable.
+    """
+    dense = [(p, score) for p, score in dense if is_relevant(score)]
+    if not dense:
+        return [], [], []
+    keyword = bm25_search(bm25, query, HYBRID_CANDIDATES, mask=mask)
+    ranked = reciprocal_rank_fusion([[p for p, _ in dense], [p for p, _ in keyword]])[:top_k]
+    return ranked, dense, keyword
+
+def local_search(query, top_k=3, embedding=None, mode=None, filters=None):
+    """Search the local store, dense only or hybrid with BM25, optionally
+    only among chunks matching filters (see vectorstore/filters.py)"""
+    from vectorstore.vector_store import get_vector_store, dense_search
+    mode = mode or RETRIEVER
+    index, chunks = get_vector_store()
+    if embedding is None:
+        embedding = embed_query(query)
+    mask = get_filter_mask(chunks, filters)
+
+    if mode == "hybrid":
+        dense = dense_search(embedding, index, HYBRID_CANDIDATES, mask=mask)
+        ranked, dense, keyword = hybrid_rank(get_bm25_index(chunks), query, dense, top_k, mask)
+    else:
+        dense = dense_search(embedding, index, top_k, mask=mask)
+        keyword = []
+        ranked = dense
+
+    dense_scores = dict(dense)
+    keyword_scores = dict(keyword)
+    return [_result(chunks[position], score, dense_scores.get(position), keyword_scores.get(position))
+            for position, score in ranked]
+
+def local_search_batch(queries, top_k=3, embeddings=None, mode=None, filters=None):
+    """local_search for many queries, with one FAISS search over all of them"""
+    from vectorstore.vector_store import get_vector_store, dense_search_batch
+    mode = mode or RETRIEVER
+    index, chunks = get_vector_store()
+    if embeddings is None:
+        embeddings = embed_queries(queries)
+    mask = get_filter_mask(chunks, filters)
+
+    if mode != "hybrid":
+        return [[_result(chunks[position], score, score, None) for position, score in dense]
+                for dense in dense_search_batch(embeddings, index, top_k, mask=mask)]
+
+    bm25 = get_bm25_index(chunks)
+    results = []
+    for query, dense in zip(queries, dense_search_batch(embeddings, index, HYBRID_CANDIDATES,
+                                                        mask=mask)):
+        ranked, dense, keyword = hybrid_rank(bm25, query, dense, top_k, mask)
+        dense_scores = dict(dense)
+        keyword_scores = dict(keyword)
+        results.append([_result(chunks[position], score, dense_scores.get(position),
+                                keyword_scores.get(position))
+                        for position, score in ranked])
+    return results
+
+def keyword_search(query, top_k=HYBRID_CANDIDATES, filters=None):
+    """BM25 search over the local store's chunks"""
+    from vectorstore.vector_store import get_vector_store
+    index, chunks = get_vector_store()
+    mask = get_filter_mask(chunks, filters)
+    return [_result(chunks[position], score, None, score)
+            for position, score in bm25_search(get_bm25_index(chunks), query, top_k, mask)]
+
+def _result(chunk, score, similarity_score, bm25_score):
+    return {
+        "chunk_id": chunk['chunk_id'],
+        "content": chunk['text'],
+        "category": chunk['category'],
+        "source": chunk['source'],
+        "similarity_score": similarity_score,
+        "bm25_score": bm25_score,
+        "score": score
+    }
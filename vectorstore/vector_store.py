@@ -1,45 +1,206 @@
+import base64
 import json
 import faiss
 import numpy as np
 import os
-from openai import AzureOpenAI
+import sys
+import threading
+import time
 from dotenv import load_dotenv
+sys.path.append('.')
+from embeddings.query_cache import embed_query
+from vectorstore.faiss_index import (configure_index, index_type_name, index_ids, normalize,
+                                     search_parameters, to_similarity)
+from vectorstore.chunk_store import ChunkStore
 
 load_dotenv('config/.env')
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
+INDEX_PATH = 'data/embeddings/faiss_index.bin'
+METADATA_PATH = 'data/embeddings/chunks_metadata.jsonl'
+OFFSETS_PATH = 'data/embeddings/chunks_metadata.offsets.npy'
+LEGACY_METADATA_PATH = 'data/embeddings/chunks_metadata.json'
+# Updates made since the index file was last written (vectorstore/mutable_store.py);
+# empty except while an update run is in progress
+LOG_PATH = 'data/embeddings/faiss_index.log.jsonl'
+
+# Memory-map the index and metadata so uvicorn workers share one copy
+MMAP_ENABLED = os.getenv("VECTOR_STORE_MMAP", "true").lower() == "true"
+
+# Seconds between checks of the files on disk for a rebuilt index
+RELOAD_CHECK_INTERVAL = float(os.getenv("VECTOR_STORE_RELOAD_INTERVAL", "5"))
+
+# Process-wide store: (index, chunks, signature), swapped as a single reference
+_store = None
+_store_lock = threading.Lock()
+_last_check = 0.0
+
+def _store_paths():
+    """Files making up the store, falling back to the old JSON metadata"""
+    if os.path.exists(LOG_PATH):
+        return (INDEX_PATH, METADATA_PATH, OFFSETS_PATH, LOG_PATH)
+    if os.path.exists(METADATA_PATH):
+        return (INDEX_PATH, METADATA_PATH, OFFSETS_PATH)
+    return (INDEX_PATH, LEGACY_METADATA_PATH)
+
+def encode_vector(vector):
+    return base64.b64encode(np.asarray(vector, dtype='float32').tobytes()).decode('ascii')
+
+def decode_vector(text):
+    return np.frombuffer(base64.b64decode(text), dtype='float32')
+
+def read_log(path=LOG_PATH):
+    """Operations in the write log, ignoring a partly written last line"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        lines = f.read().split(b'\n')[:-1]
+    return [json.loads(line) for line in lines if line.strip()]
+
+def apply_log(index, operations, chunks):
+    """Replay write-log operations onto an index loaded from its last snapshot.
+
+    Replaying is idempotent, and operations whose position no longer holds
+    their chunk (the store was compacted after they were logged) are skipped.
+    """
+    latest = {}
+    for operation in operations:
+        position = operation["id"]
+        if position >= len(chunks) or chunks[position]["chunk_id"] != operation["chunk_id"]:
+            continue
+        latest[position] = operation.get("vector")
+
+    if latest:
+        positions = np.fromiter(latest, dtype='int64', count=len(latest))
+        index.remove_ids(positions)
+        added = [(p, v) for p, v in latest.items() if v is not None]
+        if added:
+            index.add_with_ids(np.stack([decode_vector(v) for _, v in added]),
+                               np.array([p for p, _ in added], dtype='int64'))
+    return len(latest)
 
 def load_vector_store():
-    """Load FAISS index and metadata"""
-    index = faiss.read_index('data/embeddings/faiss_index.bin')
-    with open('data/embeddings/chunks_metadata.json', 'r') as f:
-        chunks = json.load(f)
-    print(f"Vector store loaded with {index.ntotal} vectors!")
+    """Load FAISS index and metadata, applying any logged updates"""
+    # Read before the other files: everything a log entry points at was
+    # written before the entry itself
+    operations = read_log() if os.path.exists(METADATA_PATH) else []
+    # A memory-mapped index is read-only, so pending updates need a private copy
+    flags = faiss.IO_FLAG_MMAP_IFC if MMAP_ENABLED and not operations else 0
+    index = faiss.read_index(INDEX_PATH, flags)
+    if os.path.exists(METADATA_PATH):
+        chunks = ChunkStore(METADATA_PATH, OFFSETS_PATH)
+    else:
+        with open(LEGACY_METADATA_PATH, 'r') as f:
+            chunks = json.load(f)
+
+    if operations:
+        apply_log(index, operations, chunks)
+    if isinstance(chunks, ChunkStore):
+        chunks.live = index_ids(index)
+    configure_index(index)
+    pending = f", {len(operations)} logged updates" if operations else ""
+    print(f"Vector store loaded with {index.ntotal} vectors ({index_type_name(index)}){pending}!")
     return index, chunks
 
+def _store_signature():
+    """mtime and size of the store files, used to detect a rebuild"""
+    signature = []
+    for path in _store_paths():
+        stat = os.stat(path)
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def _reload_if_changed():
+    """Reload the store if the files changed, keeping the old one on failure"""
+    global _store
+    try:
+        signature = _store_signature()
+    except FileNotFoundError:
+        if _store is None:
+            raise
+        return
+
+    if _store is not None and _store[2] == signature:
+        return
+
+    for _ in range(3):
+        try:
+            index, chunks = load_vector_store()
+        except Exception as e:
+            if _store is None:
+                raise
+            print(f"Vector store reload failed, keeping current store: {e}")
+            return
+
+        current = _store_signature()
+        if current == signature:
+            break
+        # Files changed again while loading (pipeline still writing) - retry
+        # next check, or right away if there is no store to serve meanwhile
+        if _store is not None:
+            return
+        signature = current
+
+    _store = (index, chunks, signature)
+
+def get_vector_store():
+    """Return the shared vector store, loaded once per process and hot reloaded"""
+    global _last_check
+    store = _store
+    now = time.monotonic()
+    if store is not None and now - _last_check < RELOAD_CHECK_INTERVAL:
+        return store[0], store[1]
+
+    # Only the first load blocks; later reloads happen in one thread while
+    # the others keep serving the current store
+    if not _store_lock.acquire(blocking=store is None):
+        return store[0], store[1]
+    try:
+        _last_check = now
+        _reload_if_changed()
+    finally:
+        _store_lock.release()
+
+    return _store[0], _store[1]
+
+def dense_search(embedding, index, top_k=3, mask=None):
+    """(position, cosine similarity) pairs for the chunks nearest to an embedding"""
+    return dense_search_batch([embedding], index, top_k, mask)[0]
+
+def dense_search_batch(embeddings, index, top_k=3, mask=None):
+    """dense_search for many query embeddings with a single index.search call.
+
+    mask is a boolean array over positions; only positions it marks are
+    searched, via a bitmap the index checks before scoring a vector.
+    """
+    if mask is None:
+        distances, indices = index.search(normalize(embeddings), top_k)
+    else:
+        allowed = int(mask.sum())
+        if not allowed:
+            return [[] for _ in range(len(embeddings))]
+        bitmap = np.packbits(mask, bitorder='little')
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        params = search_parameters(index, selector, allowed / max(index.ntotal, 1))
+        distances, indices = index.search(normalize(embeddings), top_k, params=params)
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        scores = to_similarity(index, row_distances)
+        # FAISS pads with -1 when the index holds fewer than top_k vectors
+        results.append([(int(idx), float(score)) for idx, score in zip(row_indices, scores)
+                        if idx != -1])
+    return results
+
 def search_similar_chunks(query, index, chunks, top_k=3):
-    response = client.embeddings.create(
-        input=query,
-        model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    )
-    query_embedding = np.array([response.data[0].embedding]).astype('float32')
-    
-    distances, indices = index.search(query_embedding, top_k)
-    
     results = []
-    for i, idx in enumerate(indices[0]):
-        chunk = chunks[idx].copy()
-        chunk['similarity_score'] = float(distances[0][i])
+    for idx, score in dense_search(embed_query(query), index, top_k):
+        chunk = dict(chunks[idx])
+        chunk['similarity_score'] = score
         results.append(chunk)
     
     return results
 
 if __name__ == "__main__":
-    index, chunks = load_vector_store()
+    index, chunks = get_vector_store()
     
     # Test search
     query = "Who is eligible for Medicare?"
@@ -51,4 +212,4 @@ if __name__ == "__main__":
         print(f"\nChunk: {r['chunk_id']}")
         print(f"Category: {r['category']}")
         print(f"Score: {r['similarity_score']:.4f}")
-        print(f"Text: {r['text'][:100]}...")
\ No newline at end of file
+        print(f"Text: {r['text'][:100]}...")